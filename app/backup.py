@@ -0,0 +1,338 @@
+"""Резервные копии SQLite (NFR-08): ежедневно, хранение 30 дней.
+
+Копия снимается online backup API порциями по pages страниц с паузой между
+ними, так что блокировка источника держится лишь на время одной порции.
+Снимок проверяется PRAGMA integrity_check и потоком сжимается в
+backup-<UTC>.db.gz; файл появляется атомарно (os.replace), недописанных
+копий в каталоге не бывает.
+
+Запуск вручную: python -m app.backup [--dir backups] [--retention-days 30]
+В приложении: BACKUP_ENABLED=1 запускает фоновый поток в каждом воркере;
+копию снимает тот, кто первым взял файловую блокировку, и только если
+последней копии больше BACKUP_INTERVAL секунд.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: без межпроцессной блокировки
+    fcntl = None
+
+BACKUP_ENABLED = os.getenv("BACKUP_ENABLED", "0") == "1"
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", "./backups"))
+BACKUP_INTERVAL = float(os.getenv("BACKUP_INTERVAL", "86400"))
+BACKUP_RETENTION_DAYS = float(os.getenv("BACKUP_RETENTION_DAYS", "30"))
+# 256 страниц по 4 КиБ — 1 МиБ за шаг
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.005"))
+# запись другим соединением перезапускает копирование с начала; после стольких
+# перезапусков копируем оставшееся одним шагом
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+
+NAME_PREFIX = "backup-"
+NAME_SUFFIX = ".db.gz"
+STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+COPY_CHUNK = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class BackupError(Exception):
+    pass
+
+
+@dataclass
+class BackupResult:
+    path: str
+    duration_seconds: float
+    database_bytes: int
+    compressed_bytes: int
+    restarts: int
+    pruned: int
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_name(moment: datetime) -> str:
+    return f"{NAME_PREFIX}{moment.strftime(STAMP_FORMAT)}{NAME_SUFFIX}"
+
+
+def backup_time(path: Path) -> datetime | None:
+    name = path.name
+    if not (name.startswith(NAME_PREFIX) and name.endswith(NAME_SUFFIX)):
+        return None
+    stamp = name[len(NAME_PREFIX) : -len(NAME_SUFFIX)]
+    try:
+        return datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=UTC)
+    except ValueError:
+        return None
+
+
+def list_backups(directory: Path) -> list[tuple[datetime, Path]]:
+    """Копии в каталоге от старых к новым; чужие файлы не трогаем"""
+    if not directory.is_dir():
+        return []
+    found = ((backup_time(path), path) for path in directory.iterdir())
+    return sorted((moment, path) for moment, path in found if moment is not None)
+
+
+def prune(directory: Path, retention_days: float, now: datetime) -> int:
+    """Удаляет копии старше срока хранения, самую свежую оставляет всегда"""
+    backups = list_backups(directory)
+    cutoff = now - timedelta(days=retention_days)
+    removed = 0
+    for moment, path in backups[:-1]:
+        if moment < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def remove_leftovers(directory: Path) -> None:
+    """Остатки прерванной копии (процесс убит посреди работы)"""
+    for path in directory.glob(".snapshot-*"):
+        shutil.rmtree(path, ignore_errors=True)
+    for path in directory.glob(f".{NAME_PREFIX}*.partial"):
+        path.unlink(missing_ok=True)
+
+
+def snapshot(
+    source: Path,
+    target: Path,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+    max_restarts: int = BACKUP_MAX_RESTARTS,
+) -> int:
+    """Согласованная копия source в target; возвращает число перезапусков"""
+    restarts = 0
+    src = sqlite3.connect(f"{source.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        dst = sqlite3.connect(target)
+        try:
+            last_remaining = None
+
+            def progress(status: int, remaining: int, total: int) -> None:
+                nonlocal restarts, last_remaining
+                if last_remaining is not None and remaining > last_remaining:
+                    restarts += 1
+                    if restarts > max_restarts:
+                        raise _TooManyRestarts
+                last_remaining = remaining
+                if step_sleep:
+                    time.sleep(step_sleep)
+
+            try:
+                src.backup(dst, pages=pages, progress=progress)
+            except _TooManyRestarts:
+                # один шаг держит только читающую транзакцию: в WAL писатели
+                # не ждут, в режиме rollback journal ждут не дольше busy_timeout
+                src.backup(dst, pages=-1)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return restarts
+
+
+def verify(path: Path) -> None:
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        rows = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    if rows != ["ok"]:
+        raise BackupError(f"integrity_check failed: {'; '.join(rows[:5])}")
+
+
+def compress(source: Path, target: Path) -> int:
+    """Потоковое gzip-сжатие порциями по COPY_CHUNK; пишет во временный файл
+    рядом с target и переименовывает его, возвращает размер результата"""
+    partial = target.with_name(f".{target.name}.partial")
+    try:
+        with source.open("rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+        os.replace(partial, target)
+    finally:
+        partial.unlink(missing_ok=True)
+    return target.stat().st_size
+
+
+def backup_database(
+    source: Path,
+    directory: Path = BACKUP_DIR,
+    retention_days: float = BACKUP_RETENTION_DAYS,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+    now: datetime | None = None,
+) -> BackupResult:
+    now = now or datetime.now(UTC)
+    started = time.perf_counter()
+    if not source.is_file():
+        raise BackupError(f"database file not found: {source}")
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / backup_name(now)
+
+    # несжатый снимок — во временном каталоге рядом, чтобы не гонять его между
+    # файловыми системами
+    with tempfile.TemporaryDirectory(dir=directory, prefix=".snapshot-") as tmp:
+        raw = Path(tmp) / "snapshot.db"
+        restarts = snapshot(source, raw, pages, step_sleep)
+        verify(raw)
+        database_bytes = raw.stat().st_size
+        compressed_bytes = compress(raw, target)
+
+    pruned = prune(directory, retention_days, now)
+    return BackupResult(
+        path=str(target),
+        duration_seconds=round(time.perf_counter() - started, 3),
+        database_bytes=database_bytes,
+        compressed_bytes=compressed_bytes,
+        restarts=restarts,
+        pruned=pruned,
+    )
+
+
+def database_path(url) -> Path:
+    """Путь к файлу SQLite из URL движка"""
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise BackupError(f"not a file-based SQLite database: {url!r}")
+    if url.query.get("mode") == "memory":
+        raise BackupError(f"not a file-based SQLite database: {url!r}")
+    return Path(url.database)
+
+
+class BackupStats:
+    def __init__(self) -> None:
+        self.completed = 0
+        self.failed = 0
+        self.last: BackupResult | None = None
+        self.last_success_timestamp = 0.0
+
+    def stats(self) -> dict[str, float]:
+        result = {
+            "completed": self.completed,
+            "failed": self.failed,
+            "last_success_timestamp_seconds": self.last_success_timestamp,
+        }
+        if self.last is not None:
+            result.update(
+                last_duration_seconds=self.last.duration_seconds,
+                last_database_bytes=self.last.database_bytes,
+                last_compressed_bytes=self.last.compressed_bytes,
+            )
+        return result
+
+
+backup_stats = BackupStats()
+
+
+class BackupScheduler(threading.Thread):
+    """Фоновый поток: раз в check_interval проверяет, пора ли снимать копию"""
+
+    def __init__(
+        self,
+        source: Path,
+        directory: Path = BACKUP_DIR,
+        interval: float = BACKUP_INTERVAL,
+        retention_days: float = BACKUP_RETENTION_DAYS,
+        check_interval: float = 60.0,
+        stats: BackupStats = backup_stats,
+    ):
+        super().__init__(name="sqlite-backup", daemon=True)
+        self.source = source
+        self.directory = directory
+        self.interval = interval
+        self.retention_days = retention_days
+        self.check_interval = check_interval
+        self.stats = stats
+        self._stopping = threading.Event()
+
+    def due(self, now: datetime) -> bool:
+        backups = list_backups(self.directory)
+        return not backups or (now - backups[-1][0]).total_seconds() >= self.interval
+
+    def run_once(self) -> BackupResult | None:
+        """Снимает копию, если пора и никто другой её сейчас не снимает"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / ".lock").open("w") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+            if not self.due(datetime.now(UTC)):
+                return None
+            remove_leftovers(self.directory)
+            try:
+                result = backup_database(
+                    self.source, self.directory, self.retention_days
+                )
+            except Exception:
+                self.stats.failed += 1
+                logger.exception("Backup of %s failed", self.source)
+                return None
+        self.stats.completed += 1
+        self.stats.last = result
+        self.stats.last_success_timestamp = time.time()
+        logger.info(
+            "Backup %s: %.1f s, %d -> %d bytes",
+            result.path,
+            result.duration_seconds,
+            result.database_bytes,
+            result.compressed_bytes,
+            extra=asdict(result),
+        )
+        return result
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            self.run_once()
+            self._stopping.wait(self.check_interval)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stopping.set()
+        self.join(timeout)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", type=Path, help="по умолчанию из DATABASE_URL")
+    parser.add_argument("--dir", type=Path, default=BACKUP_DIR)
+    parser.add_argument("--retention-days", type=float, default=BACKUP_RETENTION_DAYS)
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP)
+    parser.add_argument("--step-sleep", type=float, default=BACKUP_STEP_SLEEP)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.database is None:
+            from .database import engine
+
+            args.database = database_path(engine.url)
+        result = backup_database(
+            args.database, args.dir, args.retention_days, args.pages, args.step_sleep
+        )
+    except (BackupError, sqlite3.Error, OSError) as exc:
+        print(json.dumps({"error": str(exc)}), file=sys.stderr)
+        return 1
+    print(json.dumps(asdict(result), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import os
+
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .errors import ProblemHTTPException, RFC7807Error, send_problem
+
+# пользователь в JSON занимает меньше килобайта, пакет /users/bulk — до
+# BULK_MAX_ITEMS таких объектов
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(16 * 1024)))
+MAX_BULK_BODY_BYTES = int(os.getenv("MAX_BULK_BODY_BYTES", str(1024 * 1024)))
+
+
+def payload_too_large(limit: int) -> RFC7807Error:
+    return RFC7807Error(
+        status=413,
+        title="payload too large",
+        detail=f"Тело запроса больше {limit} байт",
+        type_="https://example.com/errors/payload-too-large",
+    )
+
+
+class BodySizeLimitMiddleware:
+    """Чистый ASGI: ограничение размера тела запроса до его чтения приложением.
+
+    Content-Length больше лимита — 413 сразу, тело не читается вовсе. Без
+    Content-Length (chunked) байты считаются по мере поступления, и первое
+    сообщение сверх лимита обрывает чтение: целиком тело не накапливается.
+    Тело длиннее заявленного Content-Length сервер (h11/httptools) не пропустит.
+
+    routes — лимиты по шаблонам путей ("/users/{user_id}"), проверяются по
+    порядку; остальным маршрутам достаётся default.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default: int = MAX_BODY_BYTES,
+        routes: dict[str, int] | None = None,
+    ):
+        self.app = app
+        self.default = default
+        self.routes = [
+            (compile_path(path)[0], limit) for path, limit in (routes or {}).items()
+        ]
+
+    def limit_for(self, path: str) -> int:
+        for regex, limit in self.routes:
+            if regex.match(path):
+                return limit
+        return self.default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        declared = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    pass
+                break
+
+        if declared is not None:
+            if declared > limit:
+                await send_problem(scope, receive, send, payload_too_large(limit))
+                return
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise ProblemHTTPException(payload_too_large(limit))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except ProblemHTTPException as exc:
+            # обычно исключение уже обработал exception handler приложения
+            if response_started:
+                raise
+            await send_problem(scope, receive, send, exc.error)
@@ -0,0 +1,79 @@
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+# отметка «пользователя нет» для негативного кэширования 404
+NOT_FOUND = object()
+
+
+class TTLCache:
+    """Ограниченный LRU-кэш с TTL на запись.
+
+    Кэш живёт в процессе: при нескольких воркерах инвалидация локальная,
+    устаревание в других воркерах ограничено ttl.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, now: float | None = None) -> Any:
+        """Возвращает значение, NOT_FOUND из негативного кэша или None при промахе"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if (now if now is not None else time.monotonic()) >= expires_at:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, now: float | None = None) -> None:
+        ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+        if ttl <= 0:
+            return
+        now = now if now is not None else time.monotonic()
+        self._data[key] = (now + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_MAXSIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+    # 0 отключает кэширование 404
+    negative_ttl=float(os.getenv("USER_CACHE_NEGATIVE_TTL", "5")),
+)
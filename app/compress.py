@@ -0,0 +1,254 @@
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # Python 3.14+
+    from compression import zstd as _stdlib_zstd
+except ImportError:
+    _stdlib_zstd = None
+try:
+    import zstandard as _zstandard
+except ImportError:
+    _zstandard = None
+
+ZSTD_AVAILABLE = _stdlib_zstd is not None or _zstandard is not None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# изображения, архивы и т.п. уже сжаты; сжимаем только текстовые форматы
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/problem+json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+NO_BODY_STATUSES = frozenset({204, 304})
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        # Z_SYNC_FLUSH: клиент может распаковать всё отправленное до сих пор
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        if _stdlib_zstd is not None:
+            self._obj = _stdlib_zstd.ZstdCompressor(level=level)
+            self._block = _stdlib_zstd.ZstdCompressor.FLUSH_BLOCK
+            self._frame = _stdlib_zstd.ZstdCompressor.FLUSH_FRAME
+        else:
+            self._obj = _zstandard.ZstdCompressor(level=level).compressobj()
+            self._block = _zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            self._frame = _zstandard.COMPRESSOBJ_FLUSH_FINISH
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(self._block)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(self._frame)
+
+
+CODECS = {"zstd": _Zstd, "gzip": _Gzip} if ZSTD_AVAILABLE else {"gzip": _Gzip}
+
+
+def negotiate(accept_encoding: str, available=tuple(CODECS)) -> str | None:
+    """Кодировка из Accept-Encoding: наибольший q, при равенстве — порядок available"""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _suffixed(etag: str, encoding: str) -> str:
+    """Сильный ETag сжатого представления обязан отличаться от исходного"""
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+class CompressionMiddleware:
+    """Чистый ASGI: согласованное сжатие ответа gzip или zstd.
+
+    Тело меньше minimum_size, не текстовые типы и ответы, у которых уже есть
+    Content-Encoding, уходят как есть. Потоковые ответы (more_body) сжимаются
+    по частям со сбросом после каждой, без накопления всего тела.
+
+    Сильный ETag сжатого ответа получает суффикс кодировки ("c1a2-gzip"), а из
+    входящего If-None-Match суффикс снимается, поэтому условные GET
+    приложения работают со своими исходными ETag.
+
+    levels — уровни сжатия по шаблонам путей, например для выгрузок, где
+    скорость важнее степени сжатия.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        levels: dict[str, int] | None = None,
+        routes: dict[str, dict[str, int]] | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": GZIP_LEVEL, "zstd": ZSTD_LEVEL, **(levels or {})}
+        self.routes = [
+            (compile_path(path)[0], {**self.levels, **route_levels})
+            for path, route_levels in (routes or {}).items()
+        ]
+
+    def levels_for(self, path: str) -> dict[str, int]:
+        for regex, levels in self.routes:
+            if regex.match(path):
+                return levels
+        return self.levels
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate(headers.get("accept-encoding", ""))
+        scope, etag_encoding = _strip_etag_suffixes(scope, headers)
+        level = self.levels_for(scope["path"]).get(encoding) if encoding else None
+        responder = _Responder(
+            send, encoding, level, self.minimum_size, etag_encoding == encoding
+        )
+        await self.app(scope, receive, responder)
+
+
+def _strip_etag_suffixes(scope: Scope, headers: Headers) -> tuple[Scope, str | None]:
+    value = headers.get("if-none-match")
+    if not value:
+        return scope, None
+    found = None
+    tags = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        for encoding in CODECS:
+            suffix = f'-{encoding}"'
+            if tag.endswith(suffix):
+                tag = tag[: -len(suffix)] + '"'
+                found = encoding
+                break
+        tags.append(tag)
+    if found is None:
+        return scope, None
+    raw = [(k, v) for k, v in scope["headers"] if k != b"if-none-match"]
+    raw.append((b"if-none-match", ", ".join(tags).encode("latin-1")))
+    return {**scope, "headers": raw}, found
+
+
+class _Responder:
+    """send для одного ответа: решает по первой части тела, сжимать ли"""
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: str | None,
+        level: int | None,
+        minimum_size: int,
+        suffix_not_modified: bool,
+    ):
+        self.send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.suffix_not_modified = suffix_not_modified
+        self.start: Message | None = None
+        self.compressor = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.start is not None:
+            await self._first_body(self.start, message)
+            self.start = None
+            return
+        if self.compressor is None:
+            await self.send(message)
+            return
+
+        more = message.get("more_body", False)
+        data = self.compressor.compress(message.get("body", b""))
+        data += self.compressor.flush() if more else self.compressor.finish()
+        if data or not more:
+            await self.send({**message, "body": data})
+
+    async def _first_body(self, start: Message, message: Message) -> None:
+        headers = MutableHeaders(raw=list(start.get("headers", ())))
+        status = start["status"]
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if status == 304 and self.suffix_not_modified and "etag" in headers:
+            headers["etag"] = _suffixed(headers["etag"], self.encoding)
+        compressible = (
+            status >= 200
+            and status not in NO_BODY_STATUSES
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+        if (
+            not compressible
+            or self.encoding is None
+            or (not more and len(body) < self.minimum_size)
+        ):
+            await self.send({**start, "headers": headers.raw})
+            await self.send(message)
+            return
+
+        compressor = CODECS[self.encoding](self.level)
+        headers["content-encoding"] = self.encoding
+        if "etag" in headers:
+            headers["etag"] = _suffixed(headers["etag"], self.encoding)
+        if more:
+            del headers["content-length"]
+            self.compressor = compressor
+            data = compressor.compress(body) + compressor.flush()
+        else:
+            data = compressor.compress(body) + compressor.finish()
+            headers["content-length"] = str(len(data))
+        await self.send({**start, "headers": headers.raw})
+        await self.send({**message, "body": data})
@@ -1,19 +1,84 @@
 import os
+from collections.abc import AsyncIterator
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Engine, create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
 
-# SQLALCHEMY_DATABASE_URL = os.getenv("sqlite:///./project.db")
+from .timing import instrument_engine
 
-# engine = create_engine(
-#     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-# )
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 
 if os.getenv("GITHUB_ACTIONS") == "true":
-    SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+    # общий in-memory кэш, чтобы синхронный и асинхронный движки видели одну БД
+    SQLALCHEMY_DATABASE_URL = "sqlite:///file:secdev?mode=memory&cache=shared&uri=true"
 
+
+def to_async_url(url: str) -> str:
+    """sqlite:///... -> sqlite+aiosqlite:///..., остальные драйверы не трогаем"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:") :]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL)
+)
+
+# Профили PRAGMA для SQLite. fast: WAL + synchronous=NORMAL — fsync только на
+# checkpoint, читатели не блокируются писателем. durable: fsync на каждый commit.
+SQLITE_PRAGMA_PROFILES: dict[str, dict[str, str | int]] = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "mmap_size": 0,
+        "foreign_keys": "ON",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "mmap_size": 268435456,
+        "foreign_keys": "ON",
+    },
+}
+
+
+def resolve_pragma_profile(name: str) -> str:
+    if name not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(
+            f"Unknown SQLITE_PRAGMA_PROFILE {name!r}, "
+            f"expected one of {sorted(SQLITE_PRAGMA_PROFILES)}"
+        )
+    return name
+
+
+SQLITE_PRAGMA_PROFILE = resolve_pragma_profile(
+    os.getenv("SQLITE_PRAGMA_PROFILE", "fast")
+)
+
+
+def apply_sqlite_pragmas(
+    dbapi_connection, profile: str = SQLITE_PRAGMA_PROFILE
+) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMA_PROFILES[profile].items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _on_connect(dbapi_connection, connection_record) -> None:
+    apply_sqlite_pragmas(dbapi_connection)
+
+
+# синхронный движок остаётся для схемы, миграций и служебных скриптов
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args=(
@@ -22,14 +87,72 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _on_connect)
+if async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _on_connect)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def add_missing_columns(bind: Engine) -> None:
+    """create_all не меняет существующие таблицы: досоздаём новые колонки.
+
+    Годится только для колонок с server_default или допускающих NULL.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = column.type.compile(dialect=bind.dialect)
+                if column.server_default is not None:
+                    ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}")
+                )
+
+
+def add_missing_indexes(bind: Engine) -> None:
+    """create_all не создаёт новые индексы у уже существующих таблиц"""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+_schema_checked: set[str] = set()
+
+
+def ensure_schema(bind: Engine) -> None:
+    """Создаёт таблицы и досоздаёт колонки и индексы один раз на процесс и базу.
+
+    Воркеры, форкнутые после вызова в мастере (app.server), наследуют отметку
+    и проверку не повторяют.
+    """
+    key = str(bind.url)
+    if key in _schema_checked:
+        return
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    add_missing_indexes(bind)
+    _schema_checked.add(key)
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,12 +1,15 @@
 import logging
-import re
 import uuid
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import Receive, Scope, Send
 
+from .redaction import redactor
+
+# маскирует записи фильтр на выводе LogPipeline, в потоке логов
 logger = logging.getLogger(__name__)
 
 
@@ -18,41 +21,54 @@ class RFC7807Error(Exception):
         detail: str,
         type_: str = "about:blank",
         instance: str | None = None,
+        headers: dict[str, str] | None = None,
     ):
         self.status = status
         self.title = title
         self.detail = detail
         self.type = type_
         self.instance = instance
+        self.headers = headers
+
+
+class ProblemHTTPException(StarletteHTTPException):
+    """RFC7807Error, брошенная из middleware при чтении тела запроса.
+
+    FastAPI пропускает HTTPException из request.body() как есть, а любое
+    другое исключение превращает в 400 "error parsing the body".
+    """
+
+    def __init__(self, error: RFC7807Error):
+        super().__init__(error.status, error.detail, error.headers)
+        self.error = error
+
+
+def problem_details(exc: RFC7807Error) -> dict:
+    """Тело problem+json без correlation_id — для ошибок внутри составных ответов"""
+    return {
+        "type": exc.type,
+        "title": exc.title,
+        "status": exc.status,
+        "detail": exc.detail,
+        "instance": exc.instance,
+    }
 
 
 def sanitize_error_detail(detail: str) -> str:
     """Удаляем чувствительные данные из ошибок"""
     if not isinstance(detail, str):
         return str(detail)
-
-    sensitive_patterns = [
-        (r"password[^=]*=[^,]*", "password=***"),
-        (r'("password"\s*:\s*)"[^"]*"', r'\1"***"'),
-        (r"(?i)token[^=]*=[^,]*", "token=***"),
-        (r"(?i)secret[^=]*=[^,]*", "secret=***"),
-        (r"(?i)key[^=]*=[^,]*", "key=***"),
-    ]
-
-    sanitized_detail = detail
-    for pattern, replacement in sensitive_patterns:
-        sanitized_detail = re.sub(pattern, replacement, sanitized_detail)
-
-    return sanitized_detail
+    return redactor.redact(detail)
 
 
 async def rfc7807_exception_handler(request: Request, exc: RFC7807Error):
     correlation_id = str(uuid.uuid4())
 
-    safe_detail = sanitize_error_detail(exc.detail)
-
+    # аргументы подставляются лениво; форматирование и запись — в потоке логов
     logger.error(
-        f"Error {exc.status}: {exc.title}",
+        "Error %s: %s",
+        exc.status,
+        exc.title,
         extra={
             "correlation_id": correlation_id,
             "status": exc.status,
@@ -66,7 +82,8 @@ async def rfc7807_exception_handler(request: Request, exc: RFC7807Error):
     if not request.app.debug:
         detail = "An error occurred"
     else:
-        detail = safe_detail
+        # маскируем только то, что действительно уходит клиенту
+        detail = sanitize_error_detail(exc.detail)
 
     return JSONResponse(
         status_code=exc.status,
@@ -78,9 +95,18 @@ async def rfc7807_exception_handler(request: Request, exc: RFC7807Error):
             "instance": exc.instance or str(request.url),
             "correlation_id": correlation_id,
         },
+        headers=exc.headers,
     )
 
 
+async def send_problem(
+    scope: Scope, receive: Receive, send: Send, error: RFC7807Error
+) -> None:
+    """Ответ problem+json прямо из ASGI middleware, минуя маршрутизацию"""
+    response = await rfc7807_exception_handler(Request(scope), error)
+    await response(scope, receive, send)
+
+
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     return await rfc7807_exception_handler(
         request,
@@ -93,6 +119,10 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     )
 
 
+async def problem_http_exception_handler(request: Request, exc: ProblemHTTPException):
+    return await rfc7807_exception_handler(request, exc.error)
+
+
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return await rfc7807_exception_handler(
         request,
@@ -109,4 +139,5 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 def setup_exception_handlers(app: FastAPI):
     app.add_exception_handler(RFC7807Error, rfc7807_exception_handler)
     app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(ProblemHTTPException, problem_http_exception_handler)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -0,0 +1,31 @@
+import hashlib
+from collections.abc import Iterable
+
+from fastapi import Request
+
+
+def user_etag(user_id: int, version: int, nonce: str | None, variant: str = "") -> str:
+    """variant отличает разные представления одной версии, например набор полей;
+    nonce — разные строки, получившие один id"""
+    nonce_part = f"-{nonce}" if nonce else ""
+    return f'"u{user_id}-v{version}{nonce_part}{variant}"'
+
+
+def collection_etag(rows: Iterable[tuple[int, int, str | None]], *parts: object) -> str:
+    """ETag страницы по тройкам (id, version, etag_nonce) и параметрам запроса"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(repr(part).encode())
+    for user_id, version, nonce in rows:
+        digest.update(b"%d:%d:%s;" % (user_id, version, (nonce or "").encode()))
+    return f'"c{digest.hexdigest()}"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Слабое сравнение из RFC 9110: W/-префикс не учитывается"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
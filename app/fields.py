@@ -0,0 +1,42 @@
+from .errors import RFC7807Error
+from .models import User
+
+# поля, доступные через ?fields=; password сюда не входит
+USER_FIELDS = {
+    "id": User.id,
+    "username": User.username,
+    "email": User.email,
+    "version": User.version,
+}
+DEFAULT_USER_FIELDS = tuple(USER_FIELDS)
+
+FIELDS_DESCRIPTION = "Список полей через запятую: " + ", ".join(USER_FIELDS)
+
+
+def parse_fields(value: str | None) -> tuple[str, ...]:
+    """?fields=email,username -> ("id", "username", "email"); id включается всегда"""
+    if value is None:
+        return DEFAULT_USER_FIELDS
+    requested = {name.strip() for name in value.split(",")}
+    if not requested <= USER_FIELDS.keys():
+        raise RFC7807Error(
+            status=400,
+            title="invalid fields",
+            detail=f"Допустимые поля: {', '.join(USER_FIELDS)}",
+        )
+    requested.add("id")
+    return tuple(name for name in USER_FIELDS if name in requested)
+
+
+def user_columns(fields: tuple[str, ...]) -> list:
+    """Колонки для select(): запрошенные поля по порядку, затем version и
+    etag_nonce для ETag.
+
+    Запрошенные поля идут первыми, так что dict(zip(fields, row)) берёт
+    из строки ровно их.
+    """
+    columns = [USER_FIELDS[name] for name in fields]
+    if "version" not in fields:
+        columns.append(User.version)
+    columns.append(User.etag_nonce)
+    return columns
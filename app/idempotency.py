@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+
+import orjson
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import async_engine
+from .errors import RFC7807Error, send_problem
+from .models import IdempotencyRecord
+
+# сохранённый ответ живёт сутки: за это время клиент успеет повторить запрос
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# выполняющийся запрос старше этого считается брошенным (воркер упал)
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "30"))
+# сколько дубликат ждёт завершения первого запроса, прежде чем получить 409
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+
+KEY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+KEY_MAX_LENGTH = 255
+# ожидание запроса, который выполняет другой воркер
+POLL_INTERVAL = 0.05
+PURGE_EVERY = 100
+
+table = IdempotencyRecord.__table__
+
+
+def _error(
+    status: int, title: str, detail: str, headers: dict[str, str] | None = None
+) -> RFC7807Error:
+    return RFC7807Error(
+        status=status,
+        title=title,
+        detail=detail,
+        type_=f"https://example.com/errors/idempotency-{status}",
+        headers=headers,
+    )
+
+
+def is_storable(status: int) -> bool:
+    """5xx и 429 временные: повтор с тем же ключом должен выполниться заново"""
+    return status < 500 and status != 429
+
+
+class IdempotencyStore:
+    """Ответы по ключам в таблице idempotency_keys (та же база, что и users).
+
+    Таблица общая для всех воркеров: захват ключа — INSERT с ON CONFLICT DO
+    NOTHING, поэтому выполнить запрос может только один из них.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl: float = IDEMPOTENCY_TTL,
+        lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS,
+    ):
+        self.engine = engine
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.max_keys = max_keys
+        self.executed = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self.mismatches = 0
+
+    async def claim(
+        self, key: str, fingerprint: str, now: float | None = None
+    ) -> Row | None:
+        """None — ключ захвачен и запрос надо выполнить; иначе чужая запись"""
+        now = now if now is not None else time.time()
+        async with self.engine.begin() as conn:
+            # истёкший ответ или брошенный запрос освобождают ключ
+            await conn.execute(
+                delete(table).where(table.c.key == key, table.c.expires_at <= now)
+            )
+            inserted = await conn.execute(
+                insert(table)
+                .values(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + self.lock_timeout,
+                )
+                .on_conflict_do_nothing()
+            )
+            if inserted.rowcount == 1:
+                return None
+            return (
+                await conn.execute(
+                    select(
+                        table.c.fingerprint,
+                        table.c.status,
+                        table.c.headers,
+                        table.c.body,
+                    ).where(table.c.key == key)
+                )
+            ).one()
+
+    async def complete(
+        self,
+        key: str,
+        status: int,
+        headers: Iterable[tuple[bytes, bytes]],
+        body: bytes,
+        now: float | None = None,
+    ) -> None:
+        now = now if now is not None else time.time()
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(table)
+                .where(table.c.key == key)
+                .values(
+                    status=status,
+                    headers=orjson.dumps(
+                        [(k.decode("latin-1"), v.decode("latin-1")) for k, v in headers]
+                    ).decode(),
+                    body=body,
+                    expires_at=now + self.ttl,
+                )
+            )
+
+    async def release(self, key: str) -> None:
+        """Запрос не выполнен или результат не сохраняем: ключ снова свободен"""
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                delete(table).where(table.c.key == key, table.c.status.is_(None))
+            )
+
+    async def purge(self, now: float | None = None) -> None:
+        """Удаляет истёкшие ключи и самые старые сверх max_keys"""
+        now = now if now is not None else time.time()
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(table).where(table.c.expires_at <= now))
+            count = (
+                await conn.execute(select(func.count()).select_from(table))
+            ).scalar()
+            if count > self.max_keys:
+                oldest = (
+                    select(table.c.key)
+                    .where(table.c.status.is_not(None))
+                    .order_by(table.c.expires_at)
+                    .limit(count - self.max_keys)
+                )
+                await conn.execute(delete(table).where(table.c.key.in_(oldest)))
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "mismatches": self.mismatches,
+        }
+
+
+idempotency_store = IdempotencyStore(async_engine)
+
+
+async def _read_body(receive: Receive) -> bytes | None:
+    """Тело целиком; None, если клиент отключился. Размер уже ограничен
+    BodySizeLimitMiddleware снаружи"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Чистый ASGI: Idempotency-Key для POST на заданных путях.
+
+    Первый запрос с ключом выполняется, его ответ сохраняется. Повтор с тем
+    же ключом и телом получает сохранённый ответ (Idempotent-Replayed: true)
+    без вызова обработчика; с другим телом — 422. Дубликат, пришедший пока
+    первый ещё выполняется, ждёт его завершения: в этом процессе — по
+    asyncio.Event, в другом воркере — опросом таблицы; после wait секунд — 409.
+
+    Повторы не проходят через зависимости FastAPI, поэтому лимиты запросов
+    (dependencies) для них вызываются здесь.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Iterable[str],
+        store: IdempotencyStore = idempotency_store,
+        dependencies: Sequence[Callable[[Request], Awaitable[None]]] = (),
+        wait: float = IDEMPOTENCY_WAIT,
+    ):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.store = store
+        self.dependencies = dependencies
+        self.wait = wait
+        self._in_flight: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = next((v for k, v in scope["headers"] if k == KEY_HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not 0 < len(key) <= KEY_MAX_LENGTH or not key.isascii():
+            error = _error(
+                400,
+                "invalid idempotency key",
+                f"Idempotency-Key: от 1 до {KEY_MAX_LENGTH} ASCII-символов",
+            )
+            await send_problem(scope, receive, send, error)
+            return
+        body = await _read_body(receive)
+        if body is None:
+            return
+        store_key = f"{scope['path']}:{key.decode('ascii')}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        record = await self.store.claim(store_key, fingerprint)
+        if record is not None and not await self._duplicate(
+            scope, receive, send, store_key, fingerprint, record
+        ):
+            return
+        await self._execute(scope, receive, send, store_key, body)
+
+    async def _duplicate(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        store_key: str,
+        fingerprint: str,
+        record: Row | None,
+    ) -> bool:
+        """Отвечает на дубликат; True — первый запрос ответа не сохранил
+        (5xx, 429, обрыв) и ключ захвачен этим запросом"""
+        try:
+            for dependency in self.dependencies:
+                await dependency(Request(scope))
+        except RFC7807Error as exc:
+            await send_problem(scope, receive, send, exc)
+            return False
+
+        deadline = time.monotonic() + self.wait
+        while record is not None:
+            if record.fingerprint != fingerprint:
+                self.store.mismatches += 1
+                error = _error(
+                    422,
+                    "idempotency key reused",
+                    "Idempotency-Key уже использован с другим телом запроса",
+                )
+                await send_problem(scope, receive, send, error)
+                return False
+            if record.status is not None:
+                self.store.replayed += 1
+                await self._replay(send, record)
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.store.conflicts += 1
+                error = _error(
+                    409,
+                    "request in progress",
+                    "Запрос с этим Idempotency-Key ещё выполняется",
+                    {"Retry-After": "1"},
+                )
+                await send_problem(scope, receive, send, error)
+                return False
+            event = self._in_flight.get(store_key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+            record = await self.store.claim(store_key, fingerprint)
+        return True
+
+    async def _execute(
+        self, scope: Scope, receive: Receive, send: Send, store_key: str, body: bytes
+    ) -> None:
+        event = self._in_flight[store_key] = asyncio.Event()
+        status = 500
+        headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message: Message) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture)
+            if is_storable(status):
+                await self.store.complete(store_key, status, headers, b"".join(chunks))
+                stored = True
+                self.store.executed += 1
+                if self.store.executed % PURGE_EVERY == 0:
+                    await self.store.purge()
+        finally:
+            if not stored:
+                await self.store.release(store_key)
+            del self._in_flight[store_key]
+            event.set()
+
+    @staticmethod
+    async def _replay(send: Send, record: Row) -> None:
+        headers = [
+            (k.encode("latin-1"), v.encode("latin-1"))
+            for k, v in orjson.loads(record.headers)
+        ]
+        headers.append(REPLAYED_HEADER)
+        await send(
+            {"type": "http.response.start", "status": record.status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": record.body})
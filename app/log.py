@@ -0,0 +1,166 @@
+import copy
+import logging
+import os
+import queue
+import sys
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
+
+import orjson
+
+from .redaction import RedactingFilter
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+# json | text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# логгеры uvicorn не распространяют записи до root, их перенаправляем отдельно
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.access")
+
+# всё, что есть у любой LogRecord; остальные атрибуты пришли через extra
+_RECORD_ATTRS = frozenset(
+    [*logging.LogRecord("", 0, "", 0, "", None, None).__dict__, "message", "taskName"]
+)
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON; поля из extra (correlation_id, path,
+    method, status...) попадают в объект как есть"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler с ограниченной очередью: при переполнении запись
+    отбрасывается и считается, а вызывающий поток не ждёт.
+
+    В потоке event loop остаётся только подстановка аргументов в сообщение;
+    форматирование, маскирование и запись делает поток QueueListener.
+    """
+
+    def __init__(self, maxsize: int = LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # стандартный prepare форматирует запись целиком; нам достаточно
+        # зафиксировать сообщение и traceback, пока объекты ещё живы
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # emit вызывается под self.lock, счётчики меняются без гонок
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.enqueued += 1
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+        }
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # put_nowait из базового класса упадёт на заполненной очереди
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """root и логгеры uvicorn -> очередь -> фоновый поток -> поток вывода"""
+
+    def __init__(
+        self,
+        level: str = LOG_LEVEL,
+        fmt: str = LOG_FORMAT,
+        queue_size: int = LOG_QUEUE_SIZE,
+        stream: TextIO | None = None,
+    ):
+        self.level = level
+        sink = logging.StreamHandler(stream or sys.stderr)
+        sink.setFormatter(
+            JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+        )
+        sink.addFilter(RedactingFilter())
+        self.handler = DroppingQueueHandler(queue_size)
+        self.listener = _Listener(self.handler.queue, sink)
+        self._saved: dict[str, tuple[list[logging.Handler], int]] = {}
+
+    def start(self) -> None:
+        self.listener.start()
+        root = logging.getLogger()
+        self._saved[""] = (list(root.handlers), root.level)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        for name in UVICORN_LOGGERS:
+            logger = logging.getLogger(name)
+            self._saved[name] = (list(logger.handlers), logger.level)
+            logger.handlers = [self.handler]
+
+    def stop(self) -> None:
+        for name, (handlers, level) in self._saved.items():
+            logger = logging.getLogger(name or None)
+            logger.handlers = handlers
+            logger.setLevel(level)
+        self._saved.clear()
+        # дописывает всё, что осталось в очереди
+        self.listener.stop()
+
+    def stats(self) -> dict[str, float]:
+        return self.handler.stats()
+
+
+_pipeline: LogPipeline | None = None
+
+
+def start_logging(**kwargs) -> LogPipeline:
+    """Запускается в lifespan каждого воркера: поток мастера форк не переживает"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(**kwargs)
+        _pipeline.start()
+    return _pipeline
+
+
+def stop_logging() -> None:
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
+
+
+def logging_stats() -> dict[str, float]:
+    return _pipeline.stats() if _pipeline is not None else {}
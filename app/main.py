@@ -1,20 +1,71 @@
 import re
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
 
-from fastapi import Depends, FastAPI, Request
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Body, Depends, FastAPI, Query, Request, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, ValidationError, field_validator
+from sqlalchemy import delete, insert, or_, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from .database import engine, get_db
-from .errors import RFC7807Error, setup_exception_handlers
-from .models import Base, User
+from .backup import (
+    BACKUP_ENABLED,
+    BackupScheduler,
+    backup_stats,
+    database_path,
+)
+from .body_limit import MAX_BODY_BYTES, MAX_BULK_BODY_BYTES, BodySizeLimitMiddleware
+from .cache import NOT_FOUND, user_cache
+from .compress import CompressionMiddleware
+from .database import async_engine, engine, ensure_schema, get_db
+from .errors import RFC7807Error, problem_details, setup_exception_handlers
+from .etag import collection_etag, if_none_match, user_etag
+from .fields import (
+    DEFAULT_USER_FIELDS,
+    FIELDS_DESCRIPTION,
+    parse_fields,
+    user_columns,
+)
+from .idempotency import IdempotencyMiddleware, idempotency_store
+from .log import logging_stats, start_logging, stop_logging
+from .metrics import (
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    pool_metrics,
+    render,
+    request_metrics,
+    stats_metrics,
+)
+from .models import User
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+)
+from .passwords import BCRYPT_MAX_PASSWORD_BYTES, password_hasher
+from .rate_limit import limiters, rate_limit
+from .redaction import redactor
+from .schemas import BulkCreateResponse, UserResponse
+from .search import (
+    NEXT_OFFSET_HEADER,
+    SEARCH_MAX_OFFSET,
+    SEARCH_MIN_LENGTH,
+    search_statement,
+)
 from .security_headers import SecurityHeadersMiddleware
+from .timing import ServerTimingMiddleware, TimedORJSONResponse, query_monitor
 
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="SecDev Course App", version="0.1.0")
-app.add_middleware(SecurityHeadersMiddleware)
-setup_exception_handlers(app)
+router = APIRouter()
+# /health и /metrics без лимитов: под нагрузкой 429 на них означал бы
+# перезапуск пробами оркестратора и пропуски в метриках
+service_router = APIRouter()
 
 
 class UserCreate(BaseModel):
@@ -29,6 +80,10 @@ class UserCreate(BaseModel):
     def validate_password_strength(cls, v):
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters long")
+        if len(v.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+            raise ValueError(
+                f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes in UTF-8"
+            )
         if not re.search(r"[A-Z]", v):
             raise ValueError("Password must contain at least one uppercase letter")
         if not re.search(r"[a-z]", v):
@@ -52,6 +107,10 @@ class UserUpdate(BaseModel):
             return v
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters long")
+        if len(v.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+            raise ValueError(
+                f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes in UTF-8"
+            )
         if not re.search(r"[A-Z]", v):
             raise ValueError("Password must contain at least one uppercase letter")
         if not re.search(r"[a-z]", v):
@@ -61,88 +120,487 @@ class UserUpdate(BaseModel):
         return v
 
 
-@app.get("/users")
-async def get_users(request: Request, db: Session = Depends(get_db)):
-    return db.query(User).all()
+# ADR-002: 100 запросов в минуту с одного IP на все маршруты /users
+users_limit = rate_limit("users", limit=100, period=60)
+users_rate_limit = Depends(users_limit)
+# ADR-002: общий лимит 1000 запросов в час с одного IP
+global_limit = rate_limit("global", limit=1000, period=3600)
 
 
-@app.post("/users")
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    user = (
-        db.query(User)
-        .filter(or_(User.username == user_data.name, User.email == user_data.email))
-        .first()
-    )
-    if user:
-        raise RFC7807Error(
-            status=400, title="existing user", detail="Такой пользователь уже есть"
+@router.get(
+    "/users", response_model=list[UserResponse], dependencies=[users_rate_limit]
+)
+async def get_users(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, max_length=64),
+    fields: str | None = Query(None, max_length=100, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_db),
+):
+    condition = User.id > decode_cursor(after) if after is not None else true()
+    fields_ = parse_fields(fields)
+
+    if request.headers.get("if-none-match"):
+        # узкий запрос только по полям ETag: если клиент уже видел страницу, 304
+        versions = await db.execute(
+            select(User.id, User.version, User.etag_nonce)
+            .where(condition)
+            .order_by(User.id)
+            .limit(limit + 1)
+        )
+        etag = collection_etag(versions, limit, after, fields_)
+        if if_none_match(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    # берём на одну строку больше, чтобы понять, есть ли следующая страница;
+    # выбираются только нужные колонки, строки сразу превращаются в JSON
+    rows = (
+        await db.execute(
+            select(*user_columns(fields_))
+            .where(condition)
+            .order_by(User.id)
+            .limit(limit + 1)
         )
-    user = User(
-        username=user_data.name, email=user_data.email, password=user_data.password
+    ).all()
+    headers = {
+        "ETag": collection_etag(
+            ((r.id, r.version, r.etag_nonce) for r in rows), limit, after, fields_
+        )
+    }
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    return TimedORJSONResponse(
+        [dict(zip(fields_, r, strict=False)) for r in rows], headers=headers
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
 
 
-@app.get("/users/{user_id}")
-async def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise RFC7807Error(
-            status=404, title="non existing user", detail="Такого пользователя нет"
-        )
-    return user
+EXPORT_CHUNK_SIZE = 1000
 
 
-@app.delete("/users/{user_id}")
-async def delete_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise RFC7807Error(
-            status=404, title="non existing user", detail="Такого пользователя нет"
+async def iter_users_ndjson(db: AsyncSession) -> AsyncIterator[bytes]:
+    stmt = (
+        select(User.id, User.username, User.email)
+        .order_by(User.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield b"".join(
+            orjson.dumps({"id": row.id, "username": row.username, "email": row.email})
+            + b"\n"
+            for row in partition
         )
-    db.delete(user)
-    db.commit()
-    return user
 
 
-@app.put("/users/{user_id}")
-async def update_user(
-    user_id: int,
-    user_data: UserUpdate,
-    db: Session = Depends(get_db),
+@router.get("/users/export", dependencies=[users_rate_limit])
+async def export_users(db: AsyncSession = Depends(get_db)):
+    return StreamingResponse(iter_users_ndjson(db), media_type="application/x-ndjson")
+
+
+# колонки ответа для INSERT/UPDATE/DELETE ... RETURNING
+USER_RETURNING = (User.id, User.username, User.email, User.version)
+
+
+def _existing_user_error() -> RFC7807Error:
+    return RFC7807Error(
+        status=400, title="existing user", detail="Такой пользователь уже есть"
+    )
+
+
+def _missing_user_error() -> RFC7807Error:
+    return RFC7807Error(
+        status=404, title="non existing user", detail="Такого пользователя нет"
+    )
+
+
+@router.get(
+    "/users/search", response_model=list[UserResponse], dependencies=[users_rate_limit]
+)
+async def search_users(
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    fields: str | None = Query(None, max_length=100, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_db),
+):
+    fields_ = parse_fields(fields)
+    rows = (
+        await db.execute(search_statement(q, user_columns(fields_), limit + 1, offset))
+    ).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_OFFSET_HEADER] = str(offset + limit)
+    return TimedORJSONResponse(
+        [dict(zip(fields_, r, strict=False)) for r in rows], headers=headers
+    )
+
+
+@router.post("/users", response_model=UserResponse, dependencies=[users_rate_limit])
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    # дубликаты ловит уникальный индекс, а не предварительный SELECT:
+    # один запрос к БД и нет гонки между проверкой и записью
+    password = await password_hasher.hash(user_data.password)
+    try:
+        row = (
+            await db.execute(
+                insert(User)
+                .values(
+                    username=user_data.name, email=user_data.email, password=password
+                )
+                .returning(*USER_RETURNING)
+            )
+        ).one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise _existing_user_error() from None
+    # id мог попасть в негативный кэш до создания
+    user_cache.invalidate(row.id)
+    return row._asdict()
+
+
+BULK_MAX_ITEMS = 1000
+
+
+@router.post(
+    "/users/bulk",
+    response_model=BulkCreateResponse,
+    response_model_exclude_none=True,
+    dependencies=[users_rate_limit],
+)
+async def create_users_bulk(
+    items: list[dict[str, Any]] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
 ):
-    if user_data.email or user_data.name:
-        user = (
-            db.query(User)
-            .filter(or_(User.email == user_data.email, User.username == user_data.name))
-            .first()
+    results: list[dict[str, Any] | None] = [None] * len(items)
+    valid: list[tuple[int, UserCreate]] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, UserCreate.model_validate(item)))
+        except ValidationError:
+            results[index] = {
+                "index": index,
+                "status": 422,
+                "problem": problem_details(
+                    RFC7807Error(
+                        status=422,
+                        title="Validation Error",
+                        detail="Invalid request parameters",
+                        type_="https://example.com/errors/validation",
+                    )
+                ),
+            }
+
+    # одна проверка уникальности на весь пакет
+    taken_names: set[str] = set()
+    taken_emails: set[str] = set()
+    if valid:
+        existing = await db.execute(
+            select(User.username, User.email).where(
+                or_(
+                    User.username.in_({u.name for _, u in valid}),
+                    User.email.in_({u.email for _, u in valid}),
+                )
+            )
         )
-        if user:
-            raise RFC7807Error(
-                status=400, title="existing user", detail="Такой пользователь уже есть"
+        for username, email in existing:
+            taken_names.add(username)
+            taken_emails.add(email)
+
+    to_insert: list[tuple[int, UserCreate]] = []
+    for index, user_data in valid:
+        if user_data.name in taken_names or user_data.email in taken_emails:
+            results[index] = {
+                "index": index,
+                "status": 400,
+                "problem": problem_details(_existing_user_error()),
+            }
+            continue
+        # дубликаты внутри самого пакета тоже отклоняем
+        taken_names.add(user_data.name)
+        taken_emails.add(user_data.email)
+        to_insert.append((index, user_data))
+
+    if to_insert:
+        hashed = await password_hasher.hash_many([u.password for _, u in to_insert])
+        try:
+            created = await db.execute(
+                insert(User).returning(*USER_RETURNING, sort_by_parameter_order=True),
+                [
+                    {"username": u.name, "email": u.email, "password": password}
+                    for (_, u), password in zip(to_insert, hashed, strict=True)
+                ],
             )
+            rows = created.all()
+            await db.commit()
+        except IntegrityError:
+            # параллельная вставка заняла имя или email между проверкой и записью
+            await db.rollback()
+            raise _existing_user_error() from None
+
+        for (index, _), row in zip(to_insert, rows, strict=True):
+            user_cache.invalidate(row.id)
+            results[index] = {
+                "index": index,
+                "status": 201,
+                "user": row._asdict(),
+            }
+
+    return {
+        "created": len(to_insert),
+        "failed": len(items) - len(to_insert),
+        "results": results,
+    }
+
 
-    user_db = db.query(User).filter(User.id == user_id).first()
-    if not user_db:
-        raise RFC7807Error(
-            status=404, title="non existing user", detail="Такого пользователя нет"
+@router.get(
+    "/users/{user_id}", response_model=UserResponse, dependencies=[users_rate_limit]
+)
+async def get_user_by_id(
+    user_id: int,
+    request: Request,
+    fields: str | None = Query(None, max_length=100, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_db),
+):
+    fields_ = parse_fields(fields)
+    payload = user_cache.get(user_id)
+    if payload is None:
+        # кэшируется только полное представление, частичное читается из БД;
+        # попадание в кэш обслуживает любой набор полей
+        row = (
+            await db.execute(select(*user_columns(fields_)).where(User.id == user_id))
+        ).one_or_none()
+        payload = NOT_FOUND if row is None else row._asdict()
+        if payload is NOT_FOUND or fields_ == DEFAULT_USER_FIELDS:
+            user_cache.set(user_id, payload)
+    if payload is NOT_FOUND:
+        raise _missing_user_error()
+
+    variant = "" if fields_ == DEFAULT_USER_FIELDS else "-f" + ".".join(fields_)
+    etag = user_etag(user_id, payload["version"], payload["etag_nonce"], variant)
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return TimedORJSONResponse(
+        {name: payload[name] for name in fields_}, headers={"ETag": etag}
+    )
+
+
+@router.delete(
+    "/users/{user_id}", response_model=UserResponse, dependencies=[users_rate_limit]
+)
+async def delete_user_by_id(user_id: int, db: AsyncSession = Depends(get_db)):
+    row = (
+        await db.execute(
+            delete(User).where(User.id == user_id).returning(*USER_RETURNING)
         )
+    ).one_or_none()
+    if row is None:
+        raise _missing_user_error()
+    await db.commit()
+    user_cache.invalidate(user_id)
+    return row._asdict()
+
 
+@router.put(
+    "/users/{user_id}", response_model=UserResponse, dependencies=[users_rate_limit]
+)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    # в SET попадают только переданные поля; version растёт в том же UPDATE
+    values: dict[str, Any] = {}
     if user_data.name is not None:
-        user_db.username = user_data.name
+        values["username"] = user_data.name
     if user_data.email is not None:
-        user_db.email = user_data.email
+        values["email"] = user_data.email
+    # UPDATE только если что-то меняется: иначе версия, ETag и кэш остаются.
+    # Хэш пароля солёный, сравнить его без bcrypt нельзя — новый пароль
+    # считается изменением всегда
+    changed = [getattr(User, name).is_distinct_from(v) for name, v in values.items()]
     if user_data.password is not None:
-        user_db.password = user_data.password
+        values["password"] = await password_hasher.hash(user_data.password)
+        changed = [true()]
 
-    db.commit()
-    db.refresh(user_db)
-    return user_db
+    row = None
+    if changed:
+        try:
+            row = (
+                await db.execute(
+                    update(User)
+                    .where(User.id == user_id, or_(*changed))
+                    .values(**values, version=User.version + 1)
+                    .returning(*USER_RETURNING)
+                )
+            ).one_or_none()
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise _existing_user_error() from None
+    if row is None:
+        row = (
+            await db.execute(select(*USER_RETURNING).where(User.id == user_id))
+        ).one_or_none()
+        if row is None:
+            raise _missing_user_error()
+        return row._asdict()
+    user_cache.invalidate(user_id)
+    return row._asdict()
 
 
-@app.get("/health", include_in_schema=False)
+@service_router.get("/health", include_in_schema=False)
 def health():
     return {"status": "ok"}
+
+
+@service_router.get("/metrics", include_in_schema=False)
+def metrics():
+    body = render(
+        request_metrics.render(),
+        pool_metrics({"sync": engine, "async": async_engine.sync_engine}),
+        stats_metrics(
+            "password_hasher",
+            {None: password_hasher.stats()},
+            counters=("completed", "rejected"),
+        ),
+        stats_metrics(
+            "user_cache",
+            {None: user_cache.stats()},
+            counters=("hits", "misses", "evictions", "expirations"),
+        ),
+        stats_metrics(
+            "rate_limiter",
+            {("limiter", name): limiter.stats() for name, limiter in limiters.items()},
+            counters=("allowed", "rejected", "evicted"),
+        ),
+        stats_metrics(
+            "db",
+            {None: query_monitor.stats()},
+            counters=("slow_queries", "query_heavy_requests"),
+        ),
+        stats_metrics(
+            "idempotency",
+            {None: idempotency_store.stats()},
+            counters=("executed", "replayed", "conflicts", "mismatches"),
+        ),
+        stats_metrics(
+            "backup", {None: backup_stats.stats()}, counters=("completed", "failed")
+        ),
+        stats_metrics("log", {None: logging_stats()}, counters=("enqueued", "dropped")),
+    )
+    return PlainTextResponse(body, media_type=CONTENT_TYPE)
+
+
+def openapi_json(app: FastAPI) -> bytes:
+    """Схема OpenAPI строится и сериализуется один раз на приложение"""
+    cached = getattr(app.state, "openapi_json", None)
+    if cached is None:
+        cached = app.state.openapi_json = orjson.dumps(app.openapi())
+    return cached
+
+
+@router.get("/openapi.json", include_in_schema=False)
+def openapi_schema(request: Request):
+    return Response(openapi_json(request.app), media_type="application/json")
+
+
+@router.get("/docs", include_in_schema=False)
+def swagger_ui(request: Request) -> HTMLResponse:
+    return get_swagger_ui_html(
+        openapi_url="/openapi.json", title=f"{request.app.title} - Swagger UI"
+    )
+
+
+@router.get("/redoc", include_in_schema=False)
+def redoc(request: Request) -> HTMLResponse:
+    return get_redoc_html(
+        openapi_url="/openapi.json", title=f"{request.app.title} - ReDoc"
+    )
+
+
+def warm_up(app: FastAPI) -> None:
+    """Разовая ленивая инициализация: схема БД, OpenAPI, валидаторы, regex.
+
+    app.server вызывает её в мастере до форка, и воркеры получают всё готовым.
+    В одиночном процессе то же самое произойдёт лениво при первом обращении.
+    """
+    ensure_schema(engine)
+    openapi_json(app)
+    UserCreate.model_validate(
+        {"name": "warmup", "email": "warmup@example.com", "password": "Warmup123"}
+    )
+    redactor.redact("password=warmup")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    start_logging()
+    # при импорте модуля к БД не обращаемся; после warm_up в мастере это no-op
+    await run_in_threadpool(ensure_schema, engine)
+    # первое соединение пула: поток aiosqlite и PRAGMA профиля
+    async with async_engine.connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+    # поток в каждом воркере; копию снимает один из них (файловая блокировка)
+    backups = BackupScheduler(database_path(engine.url)) if BACKUP_ENABLED else None
+    if backups is not None:
+        backups.start()
+    yield
+    if backups is not None:
+        # идущая копия не дождётся конца: поток-демон, остатки уберёт следующая
+        backups.stop(timeout=1.0)
+    password_hasher.shutdown()
+    # пул aiosqlite держит рабочие потоки, без dispose процесс не завершится
+    await async_engine.dispose()
+    stop_logging()
+
+
+BULK_COMPRESSION_LEVELS = {"gzip": 1, "zstd": 1}
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="SecDev Course App",
+        version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=TimedORJSONResponse,
+        # /openapi.json, /docs и /redoc отдаёт router из кэшированной схемы
+        openapi_url=None,
+        docs_url=None,
+        redoc_url=None,
+    )
+    # повтор с Idempotency-Key отвечается из таблицы, минуя обработчик,
+    # поэтому лимиты запросов для него проверяет сам middleware
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths=("/users", "/users/bulk"),
+        dependencies=(global_limit, users_limit),
+    )
+    # тело читается только после проверки размера; ответ 413 проходит
+    # через заголовки безопасности и метрики
+    app.add_middleware(
+        BodySizeLimitMiddleware,
+        default=MAX_BODY_BYTES,
+        routes={"/users/bulk": MAX_BULK_BODY_BYTES},
+    )
+    app.add_middleware(SecurityHeadersMiddleware)
+    # выгрузка и пакеты большие: быстрый уровень сжатия, а не максимальный
+    app.add_middleware(
+        CompressionMiddleware,
+        routes={
+            "/users/export": BULK_COMPRESSION_LEVELS,
+            "/users/bulk": BULK_COMPRESSION_LEVELS,
+        },
+    )
+    app.add_middleware(ServerTimingMiddleware)
+    # добавлен последним, значит самый внешний: в задержку входят все middleware
+    app.add_middleware(MetricsMiddleware)
+    setup_exception_handlers(app)
+    app.include_router(router, dependencies=[Depends(global_limit)])
+    app.include_router(service_router)
+    return app
+
+
+app = create_app()
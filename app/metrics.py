@@ -0,0 +1,181 @@
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from sqlalchemy import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# запросы без совпавшего маршрута сводим в одну метку, иначе 404 по
+# произвольным путям раздувают число временных рядов
+UNMATCHED_ROUTE = "<unmatched>"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestMetrics:
+    """Счётчики и гистограммы HTTP-запросов в памяти процесса.
+
+    Обновляются только из потока event loop, поэтому обходятся без блокировок.
+    В гистограмме хранятся некумулятивные счётчики корзин, накопленные суммы
+    считаются при выводе. При нескольких воркерах у каждого свои метрики.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.requests: dict[tuple[str, str, int], int] = {}
+        # (method, route) -> [счётчики корзин..., +Inf, сумма]
+        self.latency: dict[tuple[str, str], list[float]] = {}
+        self.in_progress: dict[str, int] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = [0] * (len(self.buckets) + 2)
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def reset(self) -> None:
+        self.requests.clear()
+        self.latency.clear()
+        self.in_progress.clear()
+
+    def render(self) -> Iterable[str]:
+        yield "# TYPE http_requests_total counter"
+        for (method, route, status), count in sorted(self.requests.items()):
+            yield (
+                f'http_requests_total{{method="{method}",route="{_escape(route)}",'
+                f'status="{status}"}} {count}'
+            )
+
+        yield "# TYPE http_request_duration_seconds histogram"
+        for (method, route), histogram in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram, strict=False):
+                cumulative += count
+                yield (
+                    f"http_request_duration_seconds_bucket"
+                    f'{{{labels},le="{bound}"}} {cumulative}'
+                )
+            cumulative += histogram[-2]
+            yield (
+                f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                f"{cumulative}"
+            )
+            yield f"http_request_duration_seconds_sum{{{labels}}} {histogram[-1]}"
+            yield f"http_request_duration_seconds_count{{{labels}}} {cumulative}"
+
+        yield "# TYPE http_requests_in_progress gauge"
+        for method, value in sorted(self.in_progress.items()):
+            yield f'http_requests_in_progress{{method="{method}"}} {value}'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """Чистый ASGI: время от входа в приложение до конца тела ответа.
+
+    Шаблон маршрута (/users/{user_id}) берётся из scope["route"], который
+    FastAPI выставляет при маршрутизации, поэтому метка не зависит от id.
+    Обычные маршруты Starlette (/docs, /openapi.json) оставляют только
+    scope["endpoint"]; их шаблон ищется по таблице маршрутов один раз.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+        self._endpoint_paths: dict[Callable, str] = {}
+
+    def _route_template(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._endpoint_paths.get(endpoint)
+        if path is None:
+            path = next(
+                (
+                    r.path
+                    for r in getattr(scope.get("app"), "routes", ())
+                    if getattr(r, "endpoint", None) is endpoint
+                ),
+                UNMATCHED_ROUTE,
+            )
+            self._endpoint_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress = self.metrics.in_progress
+        in_progress[method] = in_progress.get(method, 0) + 1
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress[method] -= 1
+            self.metrics.observe(method, self._route_template(scope), status, elapsed)
+
+
+def pool_metrics(engines: dict[str, Engine]) -> Iterable[str]:
+    """Состояние пулов соединений; у StaticPool/SingletonThreadPool счётчиков нет"""
+    gauges: dict[str, Callable[[object], int]] = {
+        "db_pool_size": lambda pool: pool.size(),
+        "db_pool_checked_out": lambda pool: pool.checkedout(),
+        "db_pool_checked_in": lambda pool: pool.checkedin(),
+        "db_pool_overflow": lambda pool: pool.overflow(),
+    }
+    for name, read in gauges.items():
+        yield f"# TYPE {name} gauge"
+        for label, engine in engines.items():
+            try:
+                value = read(engine.pool)
+            except AttributeError:
+                continue
+            yield f'{name}{{engine="{label}"}} {value}'
+
+
+def stats_metrics(
+    prefix: str,
+    stats_by_label: dict[tuple[str, str] | None, dict[str, float]],
+    counters: Iterable[str] = (),
+) -> Iterable[str]:
+    """Словари stats() компонентов -> метрики prefix_<ключ>{label="value"}"""
+    counters = set(counters)
+    keys = dict.fromkeys(key for stats in stats_by_label.values() for key in stats)
+    for key in keys:
+        name = f"{prefix}_{key}_total" if key in counters else f"{prefix}_{key}"
+        yield f"# TYPE {name} {'counter' if key in counters else 'gauge'}"
+        for label, stats in stats_by_label.items():
+            if key not in stats:
+                continue
+            labels = f'{{{label[0]}="{_escape(label[1])}"}}' if label else ""
+            yield f"{name}{labels} {stats[key]}"
+
+
+def render(*sections: Iterable[str]) -> str:
+    return "\n".join(line for section in sections for line in section) + "\n"
@@ -1,17 +1,51 @@
-from sqlalchemy import Column, Integer, String
+import secrets
+
+from sqlalchemy import Column, Float, Index, Integer, LargeBinary, String
 
 from .database import Base
 
 
+def new_etag_nonce() -> str:
+    return secrets.token_hex(4)
+
+
 class User(Base):
     __tablename__ = "users"
+    # AUTOINCREMENT: id удалённого пользователя не выдаётся повторно. Таблицы,
+    # созданные до этого, create_all не перестраивает, поэтому ETag опирается
+    # ещё и на etag_nonce
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True)
     username = Column(String, unique=True, nullable=True)
     email = Column(String, unique=True, nullable=True)
     password = Column(String, nullable=True)
+    # увеличивается при каждом изменении строки
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # случайное значение строки: пользователь, получивший id удалённого, не
+    # совпадёт с ним по ETag. У строк, созданных до колонки, — NULL
+    etag_nonce = Column(String, nullable=True, default=new_etag_nonce)
 
     def __init__(self, username: str = None, email: str = None, password: str = None):
         self.username = username
         self.email = email
         self.password = password
+
+
+# индексы NOCASE для регистронезависимого префиксного поиска (/users/search)
+Index("ix_users_username_nocase", User.username.collate("NOCASE"))
+Index("ix_users_email_nocase", User.email.collate("NOCASE"))
+
+
+class IdempotencyRecord(Base):
+    """Ответ на запрос с Idempotency-Key; status NULL — запрос ещё выполняется"""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    status = Column(Integer, nullable=True)
+    headers = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    # unix time; у выполняющегося запроса — срок, после которого он брошен
+    expires_at = Column(Float, nullable=False, index=True)
@@ -0,0 +1,38 @@
+import base64
+import binascii
+import re
+
+from .errors import RFC7807Error
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_CURSOR_PREFIX = "id:"
+_CURSOR_RE = re.compile(r"id:([0-9]{1,19})")
+_MAX_SQLITE_INTEGER = 2**63 - 1
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = f"{_CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Возвращает id, после которого начинается следующая страница"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raw = ""
+
+    match = _CURSOR_RE.fullmatch(raw)
+    if match and int(match.group(1)) <= _MAX_SQLITE_INTEGER:
+        return int(match.group(1))
+
+    raise RFC7807Error(
+        status=400,
+        title="invalid cursor",
+        detail="Некорректный курсор пагинации",
+    )
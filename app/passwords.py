@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import bcrypt
+
+from .errors import RFC7807Error
+
+# NFR-01: bcrypt, 12 раундов. В тестах раунды можно снизить через окружение.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))
+)
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8))
+)
+# bcrypt 5 отклоняет пароли длиннее 72 байт (ValueError); схемы запросов
+# проверяют это заранее, чтобы клиент получил 422, а не 500
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+class PasswordHasher:
+    """bcrypt в пуле процессов с ограниченной очередью.
+
+    Хэш на 12 раундах занимает ~250 мс CPU, поэтому в event loop его считать
+    нельзя. Если в очереди уже max_pending задач, новые запросы получают 503,
+    а не копятся до таймаутов.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = BCRYPT_ROUNDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: форк процесса с потоками aiosqlite небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @contextmanager
+    def _slots(self, count: int = 1) -> Iterator[None]:
+        """Занимает count мест в очереди до выхода из блока"""
+        if self.pending + count > self.max_pending:
+            self.rejected += count
+            raise RFC7807Error(
+                status=503,
+                title="service overloaded",
+                detail="Сервис перегружен, повторите запрос позже",
+            )
+        self.pending += count
+        try:
+            yield
+        finally:
+            self.pending -= count
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.completed += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    async def hash(self, password: str) -> str:
+        with self._slots():
+            return await self._run(_hash_password, password, self.rounds)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Пакет занимает в очереди по месту на пароль, как столько же
+        одиночных запросов. Пакет больше max_pending не поместится никогда —
+        413; не помещается сейчас — 503"""
+        if len(passwords) > self.max_pending:
+            self.rejected += len(passwords)
+            raise RFC7807Error(
+                status=413,
+                title="batch too large",
+                detail=f"Не больше {self.max_pending} паролей в одном запросе",
+            )
+        with self._slots(len(passwords)):
+            return list(
+                await asyncio.gather(
+                    *(self._run(_hash_password, p, self.rounds) for p in passwords)
+                )
+            )
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        with self._slots():
+            return await self._run(_check_password, password, hashed)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "queue_depth": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_avg_seconds": (
+                self.latency_total / self.completed if self.completed else 0.0
+            ),
+            "latency_max_seconds": self.latency_max,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
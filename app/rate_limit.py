@@ -0,0 +1,135 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from fastapi import Request
+
+from .errors import RFC7807Error
+
+# Ключ клиента -> (номер окна, счётчик текущего окна, счётчик предыдущего окна)
+_Entry = tuple[int, int, int]
+
+
+class SlidingWindowLimiter:
+    """Скользящее окно по двум соседним фиксированным корзинам (ADR-002).
+
+    Оценка числа запросов за последние period секунд:
+    previous * (1 - доля прошедшего текущего окна) + current.
+    На клиента хранится три числа, а не журнал отметок времени. Клиенты
+    разложены по шардам со своими блокировками; в каждом шарде LRU с
+    ограниченным размером, так что память не растёт с числом IP.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        period: float,
+        shards: int = 16,
+        max_clients: int = 100_000,
+    ):
+        self.limit = limit
+        self.period = period
+        self._shards: list[OrderedDict[str, _Entry]] = [
+            OrderedDict() for _ in range(shards)
+        ]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._max_per_shard = max(1, max_clients // shards)
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def hit(self, key: str, now: float | None = None) -> float | None:
+        """Учитывает запрос. Возвращает None или через сколько секунд повторить"""
+        if now is None:
+            now = time.monotonic()
+        window = int(now // self.period)
+        elapsed = (now % self.period) / self.period
+
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        with self._locks[index]:
+            entry = shard.get(key)
+            current = previous = 0
+            if entry is not None:
+                if entry[0] == window:
+                    _, current, previous = entry
+                elif entry[0] == window - 1:
+                    previous = entry[1]
+
+            if previous * (1 - elapsed) + current + 1 > self.limit:
+                shard[key] = (window, current, previous)
+                shard.move_to_end(key)
+                self.rejected += 1
+                return self._retry_after(current, previous, elapsed)
+
+            shard[key] = (window, current + 1, previous)
+            shard.move_to_end(key)
+            self.allowed += 1
+            self._evict(shard, window)
+        return None
+
+    def _retry_after(self, current: int, previous: int, elapsed: float) -> float:
+        if current + 1 > self.limit:
+            # ждём следующего окна, пока вес нынешнего счётчика не упадёт
+            wait = 1 - elapsed + max(0.0, 1 - (self.limit - 1) / current)
+        else:
+            wait = max(0.0, 1 - (self.limit - 1 - current) / previous - elapsed)
+        return wait * self.period
+
+    def _evict(self, shard: OrderedDict[str, _Entry], window: int) -> None:
+        # самые старые записи в начале: выкидываем простаивающие больше окна
+        while shard:
+            oldest = next(iter(shard.values()))
+            if oldest[0] >= window - 1 and len(shard) <= self._max_per_shard:
+                break
+            shard.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "clients": len(self),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+    def reset(self) -> None:
+        for lock, shard in zip(self._locks, self._shards, strict=True):
+            with lock:
+                shard.clear()
+
+
+limiters: dict[str, SlidingWindowLimiter] = {}
+
+
+def client_key(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(
+    name: str, limit: int, period: float
+) -> Callable[[Request], Awaitable[None]]:
+    """Зависимость FastAPI; лимит с одним name общий для всех маршрутов, где он указан"""
+    limiter = limiters.setdefault(name, SlidingWindowLimiter(limit, period))
+
+    async def dependency(request: Request) -> None:
+        retry_after = limiter.hit(client_key(request))
+        if retry_after is not None:
+            raise RFC7807Error(
+                status=429,
+                title="too many requests",
+                detail="Превышен лимит запросов",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    return dependency
+
+
+def reset_limiters() -> None:
+    for limiter in limiters.values():
+        limiter.reset()
@@ -0,0 +1,100 @@
+import logging
+import re
+from collections.abc import Callable
+
+Replacement = Callable[[re.Match[str]], str]
+
+
+class RedactionEngine:
+    """Реестр правил маскирования, собранный в одно регулярное выражение.
+
+    Каждое правило — именованная группа в общей альтернации, поэтому текст
+    проходится один раз, а не по разу на правило. У правила есть keyword —
+    строка, которая (без учёта регистра) есть в любом его совпадении, и lead —
+    первый символ совпадения. Текст без ключевых слов возвращается без запуска
+    regex, а lookahead по lead-символам позволяет не пробовать все ветви
+    альтернации на каждой позиции. Выражение компилируется при первом
+    использовании после регистрации правил.
+    """
+
+    def __init__(self) -> None:
+        self._rules: dict[str, tuple[str, Replacement]] = {}
+        self._keywords: set[str] = set()
+        self._leads: set[str] = set()
+        self._compiled: re.Pattern[str] | None = None
+
+    def register(
+        self,
+        name: str,
+        pattern: str,
+        replacement: str | Replacement,
+        *,
+        keyword: str,
+        lead: str | None = None,
+    ) -> None:
+        if not name.isidentifier():
+            raise ValueError(f"Rule name must be an identifier: {name!r}")
+        if isinstance(replacement, str):
+            fixed = replacement
+
+            def replacement(match: re.Match[str]) -> str:
+                return fixed
+
+        self._rules[name] = (pattern, replacement)
+        self._keywords.add(keyword.lower())
+        lead = lead or keyword[0]
+        self._leads.update({lead.lower(), lead.upper()})
+        self._compiled = None
+
+    @property
+    def pattern(self) -> re.Pattern[str]:
+        if self._compiled is None:
+            leads = "".join(re.escape(c) for c in sorted(self._leads))
+            alternation = "|".join(
+                f"(?P<{name}>{pattern})" for name, (pattern, _) in self._rules.items()
+            )
+            self._compiled = re.compile(f"(?=[{leads}])(?:{alternation})")
+        return self._compiled
+
+    def _replace(self, match: re.Match[str]) -> str:
+        return self._rules[match.lastgroup][1](match)
+
+    def redact(self, text: str) -> str:
+        lowered = text.lower()
+        if not any(keyword in lowered for keyword in self._keywords):
+            return text
+        return self.pattern.sub(self._replace, text)
+
+
+redactor = RedactionEngine()
+redactor.register(
+    "password_kv", r"(?i:password)[^=]*=[^,]*", "password=***", keyword="password"
+)
+redactor.register(
+    "password_json",
+    r'(?P<password_json_key>"(?i:password)"\s*:\s*)"[^"]*"',
+    lambda m: m.group("password_json_key") + '"***"',
+    keyword="password",
+    lead='"',
+)
+redactor.register("token_kv", r"(?i:token)[^=]*=[^,]*", "token=***", keyword="token")
+redactor.register(
+    "secret_kv", r"(?i:secret)[^=]*=[^,]*", "secret=***", keyword="secret"
+)
+redactor.register("key_kv", r"(?i:key)[^=]*=[^,]*", "key=***", keyword="key")
+
+
+class RedactingFilter(logging.Filter):
+    """Маскирует сообщение записи лога; срабатывает только для реально выводимых записей"""
+
+    def __init__(self, engine: RedactionEngine = redactor):
+        super().__init__()
+        self.engine = engine
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        redacted = self.engine.redact(message)
+        if redacted != message:
+            record.msg = redacted
+            record.args = None
+        return True
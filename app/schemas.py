@@ -1,6 +1,9 @@
 import re
+from typing import Any
 
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+
+from .passwords import BCRYPT_MAX_PASSWORD_BYTES
 
 
 class UserBase(BaseModel):
@@ -22,6 +25,10 @@ class UserCreate(BaseModel):
     def validate_password_strength(cls, v: str) -> str:
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters long")
+        if len(v.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+            raise ValueError(
+                f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes in UTF-8"
+            )
         if not re.search(r"[A-Z]", v):
             raise ValueError("Password must contain at least one uppercase letter")
         if not re.search(r"[a-z]", v):
@@ -45,6 +52,10 @@ class UserUpdate(BaseModel):
             return v
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters long")
+        if len(v.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+            raise ValueError(
+                f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes in UTF-8"
+            )
         if not re.search(r"[A-Z]", v):
             raise ValueError("Password must contain at least one uppercase letter")
         if not re.search(r"[a-z]", v):
@@ -55,7 +66,20 @@ class UserUpdate(BaseModel):
 
 
 class UserResponse(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
+    version: int
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: int
+    user: UserResponse | None = None
+    problem: dict[str, Any] | None = None
+
 
-    class Config:
-        from_attributes = True
+class BulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
@@ -0,0 +1,38 @@
+from sqlalchemy import Select, case, or_, select
+
+from .models import User
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_OFFSET = 1000
+
+NEXT_OFFSET_HEADER = "X-Next-Offset"
+
+
+def prefix_pattern(query: str) -> str:
+    """Префиксный LIKE-шаблон; %, _ и \\ из запроса ищутся буквально"""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def search_statement(query: str, columns: list, limit: int, offset: int) -> Select:
+    """Поиск по префиксу username или email без учёта регистра.
+
+    LIKE в SQLite по умолчанию регистронезависим и с индексом COLLATE NOCASE
+    превращается в диапазонный поиск по индексу (LIKE optimization), а OR по
+    двум колонкам — в MULTI-INDEX OR. Сортируются только найденные строки:
+    точное совпадение username, затем префикс username, затем префикс email.
+    """
+    pattern = prefix_pattern(query)
+    username_match = User.username.like(pattern, escape="\\")
+    rank = case(
+        (User.username.collate("NOCASE") == query, 0),
+        (username_match, 1),
+        else_=2,
+    )
+    return (
+        select(*columns)
+        .where(or_(username_match, User.email.like(pattern, escape="\\")))
+        .order_by(rank, User.username.collate("NOCASE"), User.id)
+        .limit(limit)
+        .offset(offset)
+    )
@@ -1,45 +1,66 @@
-import time
-
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-
-        security_headers = {
-            "X-Content-Type-Options": "nosniff",
-            "X-Frame-Options": "DENY",
-            "X-XSS-Protection": "1; mode=block",
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-            "Content-Security-Policy": "default-src 'self'; script-src 'self' "
-            "'unsafe-inline' https://cdn.jsdelivr.net; style-src 'self' "
-            "'unsafe-inline' https://cdn.jsdelivr.net; img-src 'self' "
-            "data: https://fastapi.tiangolo.com; font-src 'self' https://cdn.jsdelivr.net;",
-            "Referrer-Policy": "strict-origin-when-cross-origin",
-            "Permissions-Policy": "geolocation=(), microphone=()",
-        }
-
-        path = request.url.path
-        if not path.startswith(("/docs", "/redoc", "/openapi.json")):
-            for header, value in security_headers.items():
-                response.headers[header] = value
-        else:
-            docs_headers = {
-                "X-Content-Type-Options": "nosniff",
-                "X-Frame-Options": "DENY",
-            }
-            for header, value in docs_headers.items():
-                response.headers[header] = value
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'; script-src 'self' "
+    "'unsafe-inline' https://cdn.jsdelivr.net; style-src 'self' "
+    "'unsafe-inline' https://cdn.jsdelivr.net; img-src 'self' "
+    "data: https://fastapi.tiangolo.com; font-src 'self' https://cdn.jsdelivr.net;",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "geolocation=(), microphone=()",
+}
+
+# Swagger UI и ReDoc грузят скрипты с CDN, поэтому для них только базовый набор
+DOCS_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+}
+DOCS_PATH_PREFIXES = ("/docs", "/redoc", "/openapi.json")
+
+HEADERS_TO_REMOVE = ("server", "x-powered-by")
+
+
+def _encode(headers: dict[str, str]) -> list[tuple[bytes, bytes]]:
+    return [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in headers.items()
+    ]
 
-        headers_to_remove = ["server", "x-powered-by"]
-        for header in headers_to_remove:
-            if header in response.headers:
-                del response.headers[header]
 
-        response.headers["X-Process-Time"] = str(process_time)
+class SecurityHeadersMiddleware:
+    """Чистый ASGI: заголовки закодированы один раз и дописываются в http.response.start"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.api_headers = _encode(SECURITY_HEADERS)
+        self.docs_headers = _encode(DOCS_HEADERS)
+        # имена, которые выставляет middleware или которые надо удалить
+        removed = {name.encode("latin-1") for name in HEADERS_TO_REMOVE}
+        self.api_drop = frozenset(removed | {n for n, _ in self.api_headers})
+        self.docs_drop = frozenset(removed | {n for n, _ in self.docs_headers})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"].startswith(DOCS_PATH_PREFIXES):
+            extra, drop = self.docs_headers, self.docs_drop
+        else:
+            extra, drop = self.api_headers, self.api_drop
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", ())
+                    if name.lower() not in drop
+                ]
+                headers.extend(extra)
+                message["headers"] = headers
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,259 @@
+"""Запуск в production: python -m app.server
+
+Мастер-процесс импортирует приложение, проверяет схему БД, строит OpenAPI,
+открывает слушающий сокет и форкает воркеры uvicorn: всё это достаётся им
+готовым, без повторного импорта и повторной работы.
+SIGTERM/SIGINT — мягкая остановка, воркеры дообслуживают начатые запросы.
+SIGHUP — поочерёдный перезапуск воркеров: новый поднимается до того, как
+старый начнёт останавливаться, так что сокет всё время обслуживается.
+Новый код SIGHUP не подхватывает: воркеры форкаются из того же мастера.
+"""
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> float | None:
+    """Квота CPU в ядрах из cgroup v2 (cpu.max) или v1 (cpu.cfs_quota_us)"""
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """Ядра, которые процесс реально может занять: affinity, урезанная квотой"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def event_loop_options() -> dict[str, str]:
+    """uvloop и httptools, если установлены; иначе стандартные asyncio и h11"""
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    }
+
+
+class Supervisor:
+    """Форкает воркеры uvicorn на общий сокет и следит за ними"""
+
+    def __init__(self, config, workers: int, graceful_timeout: float):
+        self.config = config
+        self.size = workers
+        self.graceful_timeout = graceful_timeout
+        # pid воркера -> конец канала, в который он пишет после старта
+        self.workers: dict[int, int] = {}
+        self.sockets: list[socket.socket] = []
+        self.stopping = False
+        self.reload_requested = False
+
+    def run(self) -> int:
+        self.sockets = [self.config.bind_socket()]
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        logger.info("Starting %d workers (pid %d)", self.size, os.getpid())
+
+        for _ in range(self.size):
+            pid = self.spawn()
+            if not self.wait_ready(pid):
+                self.stop_all()
+                return 1
+
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            time.sleep(0.2)
+
+        self.stop_all()
+        for sock in self.sockets:
+            sock.close()
+        return 0
+
+    def _handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        self.reload_requested = True
+
+    def spawn(self) -> int:
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            for fd in self.workers.values():
+                os.close(fd)
+            os._exit(self._worker(ready_write))
+        os.close(ready_write)
+        self.workers[pid] = ready_read
+        return pid
+
+    def _worker(self, ready_fd: int) -> int:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # перезапуском управляет мастер
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        import uvicorn
+
+        from .database import async_engine, engine
+
+        # соединения, открытые мастером при импорте, воркеру использовать нельзя
+        engine.dispose(close=False)
+        async_engine.sync_engine.dispose(close=False)
+
+        class Server(uvicorn.Server):
+            async def startup(self, sockets=None) -> None:
+                await super().startup(sockets)
+                if not self.should_exit:
+                    os.write(ready_fd, b"1")
+                os.close(ready_fd)
+
+        server = Server(self.config)
+        try:
+            server.run(sockets=self.sockets)
+        except SystemExit as exc:
+            return exc.code if isinstance(exc.code, int) else 1
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            return 1
+        return 0 if server.started else 3
+
+    def wait_ready(self, pid: int, timeout: float = 60.0) -> bool:
+        fd = self.workers[pid]
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if readable and os.read(fd, 1) == b"1":
+            logger.info("Worker %d ready", pid)
+            return True
+        logger.error("Worker %d failed to start", pid)
+        self.terminate(pid)
+        return False
+
+    def terminate(self, pid: int, signalled: bool = False) -> None:
+        """SIGTERM и ожидание; после graceful_timeout — SIGKILL"""
+        if not signalled:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while time.monotonic() < deadline:
+            if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                break
+            time.sleep(0.05)
+        else:
+            logger.warning("Worker %d did not drain in time, killing", pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        os.close(self.workers.pop(pid))
+
+    def rolling_restart(self) -> None:
+        logger.info("Rolling restart of %d workers", len(self.workers))
+        for old in list(self.workers):
+            new = self.spawn()
+            if not self.wait_ready(new):
+                # старые воркеры продолжают работать
+                logger.error("Rolling restart aborted")
+                return
+            self.terminate(old)
+
+    def reap(self) -> None:
+        """Заменяет неожиданно завершившиеся воркеры"""
+        for pid in list(self.workers):
+            if os.waitpid(pid, os.WNOHANG)[0] != pid:
+                continue
+            os.close(self.workers.pop(pid))
+            logger.warning("Worker %d exited unexpectedly, respawning", pid)
+            # не раскручиваем цикл перезапусков, если воркер падает при старте
+            time.sleep(1)
+            self.spawn()
+
+    def stop_all(self) -> None:
+        logger.info("Stopping %d workers", len(self.workers))
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # все воркеры дообслуживают запросы параллельно, terminate лишь ждёт
+        for pid in list(self.workers):
+            self.terminate(pid, signalled=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    cpus = available_cpus()
+    parser = argparse.ArgumentParser(description="Запуск приложения с воркерами")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))  # noqa: S104
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(cpus)))
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=float(os.getenv("GRACEFUL_TIMEOUT", "30")),
+    )
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+    workers = max(1, args.workers)
+
+    # ядра делятся между веб-воркерами, у каждого свой пул хэширования паролей
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, cpus // workers)))
+
+    import uvicorn
+
+    from .main import app, warm_up
+
+    warm_up(app)
+
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        lifespan="on",
+        timeout_graceful_shutdown=int(args.graceful_timeout),
+        log_level=args.log_level,
+        server_header=False,
+        **event_loop_options(),
+    )
+    logger.info(
+        "CPU available: %d, workers: %d, loop: %s, http: %s",
+        cpus,
+        workers,
+        config.loop,
+        config.http,
+    )
+    return Supervisor(config, workers, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
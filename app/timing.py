@@ -0,0 +1,253 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import UNMATCHED_ROUTE
+
+# Server-Timing раскрывает клиенту длительность запросов к БД; в окружении,
+# где это нежелательно, заголовок отключается (учёт и логи остаются)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# не чаще одной записи на нормализованный запрос (или маршрут) за интервал
+SLOW_QUERY_LOG_INTERVAL = float(os.getenv("SLOW_QUERY_LOG_INTERVAL", "60"))
+# больше запросов на один HTTP-запрос — вероятно, N+1
+QUERY_COUNT_WARN = int(os.getenv("QUERY_COUNT_WARN", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RequestTiming:
+    started: float
+    queries: int = 0
+    db: float = 0.0
+    serialize: float = 0.0
+
+    def header(self, now: float) -> bytes:
+        total = now - self.started
+        app = max(0.0, total - self.db - self.serialize)
+        return (
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries", '
+            f"serialize;dur={self.serialize * 1000:.2f}, "
+            f"app;dur={app * 1000:.2f}"
+        ).encode("latin-1")
+
+
+# изменяемый объект в contextvar: копии контекста (run_in_threadpool,
+# greenlet SQLAlchemy) ссылаются на него же и пишут в общий счётчик
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> RequestTiming | None:
+    return _current.get()
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """SQL без значений: литералы -> ?, списки плейсхолдеров IN (...) свёрнуты"""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("?, ...", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def _shape(parameters) -> str:
+    if isinstance(parameters, dict):
+        return ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items())
+    return ", ".join(type(v).__name__ for v in parameters or ())
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Типы параметров без значений: "int, str" или "500 x (str, str)" """
+    if executemany:
+        first = parameters[0] if parameters else ()
+        return f"{len(parameters)} x ({_shape(first)})"
+    return _shape(parameters)
+
+
+class Throttle:
+    """Разрешает событие по ключу не чаще раза в interval секунд"""
+
+    def __init__(self, interval: float = SLOW_QUERY_LOG_INTERVAL):
+        self.interval = interval
+        # ключ -> (время последней записи, пропущено с тех пор)
+        self._last: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> int | None:
+        """Число подавленных событий, если пора писать, иначе None"""
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._last.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._last[key] = (last, suppressed + 1)
+                return None
+            self._last[key] = (now, 0)
+            return suppressed
+
+
+class QueryMonitor:
+    """Медленные запросы и HTTP-запросы с подозрительно большим числом SQL"""
+
+    def __init__(
+        self,
+        slow_query_ms: float = SLOW_QUERY_MS,
+        query_count_warn: int = QUERY_COUNT_WARN,
+        interval: float = SLOW_QUERY_LOG_INTERVAL,
+    ):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.query_count_warn = query_count_warn
+        self.throttle = Throttle(interval)
+        self.slow_queries = 0
+        self.query_heavy_requests = 0
+
+    def query(
+        self, statement: str, parameters, executemany: bool, seconds: float
+    ) -> None:
+        if seconds < self.slow_query_seconds:
+            return
+        self.slow_queries += 1
+        normalized = normalize_statement(statement)
+        suppressed = self.throttle.allow("sql:" + normalized)
+        if suppressed is None:
+            return
+        logger.warning(
+            "Slow query %.1f ms: %s",
+            seconds * 1000,
+            normalized,
+            extra={
+                "duration_ms": round(seconds * 1000, 2),
+                "statement": normalized,
+                "parameters": parameter_shape(parameters, executemany),
+                "suppressed": suppressed,
+            },
+        )
+
+    def request(self, method: str, route: str, timing: RequestTiming) -> None:
+        if timing.queries <= self.query_count_warn:
+            return
+        self.query_heavy_requests += 1
+        suppressed = self.throttle.allow(f"route:{method} {route}")
+        if suppressed is None:
+            return
+        logger.warning(
+            "%s %s issued %d queries (limit %d), possible N+1",
+            method,
+            route,
+            timing.queries,
+            self.query_count_warn,
+            extra={
+                "method": method,
+                "route": route,
+                "queries": timing.queries,
+                "db_ms": round(timing.db * 1000, 2),
+                "suppressed": suppressed,
+            },
+        )
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "slow_queries": self.slow_queries,
+            "query_heavy_requests": self.query_heavy_requests,
+        }
+
+
+query_monitor = QueryMonitor()
+
+_STARTED = "query_started"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    started = conn.info.get(_STARTED)
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    timing = _current.get()
+    if timing is not None:
+        timing.queries += 1
+        timing.db += elapsed
+    query_monitor.query(statement, parameters, many, elapsed)
+
+
+def _handle_error(context) -> None:
+    # after_cursor_execute при ошибке не вызывается, время старта снимаем здесь
+    started = context.connection.info.get(_STARTED) if context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Время и число SQL-запросов на HTTP-запрос; для async — sync_engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """ORJSONResponse, который учитывает время сериализации в Server-Timing"""
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = super().render(content)
+        timing = _current.get()
+        if timing is not None:
+            timing.serialize += time.perf_counter() - started
+        return body
+
+
+class ServerTimingMiddleware:
+    """Чистый ASGI: заводит RequestTiming на запрос, дописывает Server-Timing
+    в http.response.start, по завершении проверяет число запросов к БД"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        monitor: QueryMonitor = query_monitor,
+        header: bool = SERVER_TIMING,
+    ):
+        self.app = app
+        self.monitor = monitor
+        self.header = header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(time.perf_counter())
+        token = _current.set(timing)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.header and message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", timing.header(time.perf_counter())))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.monitor.request(
+                scope["method"], route.path if route else UNMATCHED_ROUTE, timing
+            )
@@ -0,0 +1,147 @@
+"""Сравнение синхронной сессии в async-хендлере и AsyncSession под параллельной нагрузкой.
+
+Задержка считается от момента постановки запроса в очередь, то есть включает
+ожидание семафора и заблокированного event loop. Рядом с нагрузкой на БД
+идёт открытый поток лёгких запросов без БД (как /health) с фиксированным
+расписанием прихода — по их задержке видно, обслуживает ли приложение
+остальные запросы, пока идут SQL-запросы.
+
+Запуск: python -m benchmarks.bench_async_db --requests 300 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User
+
+Query = Callable[[], Awaitable[None]]
+
+
+def seed(url: str, rows: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {"username": f"user{i}", "email": f"user{i}@example.com"}
+                for i in range(rows)
+            ],
+        )
+    engine.dispose()
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[max(int(len(values) * q) - 1, 0)] * 1000, 2)
+
+
+async def timed(
+    semaphore: asyncio.Semaphore,
+    call: Query,
+    latencies: list[float],
+    enqueued: float,
+) -> None:
+    async with semaphore:
+        await call()
+    latencies.append(time.perf_counter() - enqueued)
+
+
+async def light_request() -> None:
+    """Запрос без БД: сериализация маленького ответа"""
+    json.dumps({"status": "ok"})
+    await asyncio.sleep(0)
+
+
+async def run(query: Query, requests: int, concurrency: int) -> dict:
+    db_semaphore = asyncio.Semaphore(concurrency)
+    light_semaphore = asyncio.Semaphore(concurrency)
+    db_latencies: list[float] = []
+    light_latencies: list[float] = []
+
+    async def light_stream(started: float) -> None:
+        # запрос i приходит в started + i * 1 мс, даже если loop был занят
+        for i in range(requests):
+            arrival = started + i * 0.001
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await timed(light_semaphore, light_request, light_latencies, arrival)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        light_stream(started),
+        *(timed(db_semaphore, query, db_latencies, started) for _ in range(requests)),
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "db_rps": round(requests / elapsed, 1),
+        "db_p50_ms": percentile(db_latencies, 0.50),
+        "db_p95_ms": percentile(db_latencies, 0.95),
+        "light_p50_ms": percentile(light_latencies, 0.50),
+        "light_p95_ms": percentile(light_latencies, 0.95),
+        "wall_s": round(elapsed, 3),
+    }
+
+
+async def main(requests: int, concurrency: int, rows: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(f"sqlite:///{path}", rows)
+    workloads = {
+        # страница списка по индексу первичного ключа
+        "page": select(User).order_by(User.id).limit(50),
+        # полный проход по таблице: SQLite отпускает GIL, запросы могут идти параллельно
+        "scan": select(func.count()).where(User.email.like("%9%@example.com")),
+    }
+
+    sync_engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    SyncSession = sessionmaker(bind=sync_engine)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", pool_size=concurrency
+    )
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    result: dict[str, dict] = {}
+    for name, stmt in workloads.items():
+
+        async def sync_query(stmt=stmt) -> None:
+            with SyncSession() as db:
+                db.execute(stmt).all()
+
+        async def async_query(stmt=stmt) -> None:
+            async with AsyncSession() as db:
+                (await db.execute(stmt)).all()
+
+        result[name] = {
+            "sync_session": await run(sync_query, requests, concurrency),
+            "async_session": await run(async_query, requests, concurrency),
+        }
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(main(args.requests, args.concurrency, args.rows)), indent=2
+        )
+    )
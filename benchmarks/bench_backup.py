@@ -0,0 +1,91 @@
+"""Задержка записи во время резервного копирования: backup одним шагом против
+порций по --pages страниц с паузой.
+
+Писатель в отдельном потоке непрерывно делает INSERT + COMMIT; измеряется
+максимальная и p99 задержка commit, пока идёт копия. В режиме rollback
+journal читающая транзакция backup блокирует commit писателя, в WAL — нет.
+
+Запуск: python -m benchmarks.bench_backup --size-mb 64
+"""
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.backup import snapshot
+
+
+def prepare(path: Path, size_mb: int, journal_mode: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, payload BLOB)")
+    row = b"x" * 4000
+    conn.executemany(
+        "INSERT INTO t (payload) VALUES (?)", [(row,)] * (size_mb * 1024 // 4)
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(source: Path, target: Path, pages: int, step_sleep: float) -> dict:
+    stop = threading.Event()
+    latencies: list[float] = []
+
+    def writer() -> None:
+        conn = sqlite3.connect(source, timeout=30)
+        while not stop.is_set():
+            started = time.perf_counter()
+            conn.execute("INSERT INTO t (payload) VALUES (?)", (b"y" * 100,))
+            conn.commit()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.001)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    restarts = snapshot(source, target, pages, step_sleep)
+    duration = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    target.unlink()
+
+    latencies.sort()
+    return {
+        "backup_seconds": round(duration, 3),
+        "restarts": restarts,
+        "writes": len(latencies),
+        "write_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "write_max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def main() -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--pages", type=int, default=256)
+    parser.add_argument("--step-sleep", type=float, default=0.005)
+    args = parser.parse_args()
+
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for journal_mode in ("wal", "delete"):
+            source = Path(tmp) / f"{journal_mode}.db"
+            prepare(source, args.size_mb, journal_mode)
+            target = Path(tmp) / "copy.db"
+            result[journal_mode] = {
+                "one_step": measure(source, target, -1, 0),
+                f"steps_of_{args.pages}": measure(
+                    source, target, args.pages, args.step_sleep
+                ),
+            }
+    return result
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(), indent=2))
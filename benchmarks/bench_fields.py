@@ -0,0 +1,65 @@
+"""Размер ответа и задержка GET /users с ?fields= и без на широких страницах.
+
+Запросы идут через ASGI в приложение app.main:app поверх временного
+SQLite-файла; лимиты сбрасываются между запросами.
+
+Запуск: python -m benchmarks.bench_fields --rows 10000 --requests 300
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from .loadtest import prepare_database
+
+
+async def measure(client, params: dict, requests: int) -> dict:
+    from app.rate_limit import reset_limiters
+
+    latencies = []
+    size = 0
+    for _ in range(requests):
+        reset_limiters()
+        started = time.perf_counter()
+        response = await client.get("/users", params=params)
+        latencies.append(time.perf_counter() - started)
+        size = len(response.content)
+    latencies.sort()
+    return {
+        "bytes": size,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+    }
+
+
+async def main(requests: int, limit: int) -> dict:
+    import httpx
+
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as c:
+            full = await measure(c, {"limit": limit}, requests)
+            sparse = await measure(
+                c, {"limit": limit, "fields": "id,username"}, requests
+            )
+    return {
+        "rows_per_page": limit,
+        "full": full,
+        "fields=id,username": sparse,
+        "bytes_saved": f"{1 - sparse['bytes'] / full['bytes']:.0%}",
+        "p50_saved": f"{1 - sparse['p50_ms'] / full['p50_ms']:.0%}",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+    prepare_database(args.rows)
+    print(json.dumps(asyncio.run(main(args.requests, args.limit)), indent=2))
@@ -0,0 +1,91 @@
+"""Цена logger.error для вызывающего потока: синхронный StreamHandler против
+очереди (app.log) при быстром и медленном приёмнике.
+
+Медленный приёмник имитирует забитый pipe или сетевой сборщик логов:
+каждая запись в него занимает --sink-delay-ms.
+
+Запуск: python -m benchmarks.bench_logging
+"""
+
+import argparse
+import io
+import json
+import logging
+import time
+
+from app.log import JSONFormatter, LogPipeline
+from app.redaction import RedactingFilter
+
+EXTRA = {
+    "correlation_id": "0b6c7f9e-7a7e-4f55-9d61-4c1d0c1f2a6b",
+    "status": 404,
+    "type": "about:blank",
+    "instance": "http://testserver/users/1",
+    "path": "/users/1",
+    "method": "GET",
+}
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return super().write(text)
+
+
+def measure(logger: logging.Logger, number: int) -> dict:
+    samples = []
+    for i in range(number):
+        started = time.perf_counter()
+        logger.error("Error %s: %s", 404, "Not Found", extra=EXTRA)
+        samples.append(time.perf_counter() - started)
+        if i % 10 == 0:
+            # запросы приходят не сплошным потоком
+            time.sleep(0.0005)
+    samples.sort()
+    return {
+        "mean_us": round(sum(samples) / number * 1e6, 2),
+        "p99_us": round(samples[int(number * 0.99)] * 1e6, 2),
+        "max_us": round(samples[-1] * 1e6, 2),
+    }
+
+
+def run(sink_delay: float, number: int) -> dict:
+    logger = logging.getLogger("bench.logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    direct = logging.StreamHandler(SlowStream(sink_delay))
+    direct.setFormatter(JSONFormatter())
+    direct.addFilter(RedactingFilter())
+    logger.handlers = [direct]
+    sync = measure(logger, number)
+
+    pipeline = LogPipeline(level="INFO", stream=SlowStream(sink_delay))
+    logger.handlers = [pipeline.handler]
+    pipeline.listener.start()
+    queued = measure(logger, number)
+    queued.update(dropped=pipeline.handler.dropped)
+    pipeline.listener.stop()
+    return {"sync": sync, "queue": queued}
+
+
+def main() -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--sink-delay-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    return {
+        "fast_sink": run(0.0, args.number),
+        f"slow_sink_{args.sink_delay_ms}ms": run(
+            args.sink_delay_ms / 1000, args.number
+        ),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(), indent=2))
@@ -0,0 +1,41 @@
+"""Накладные расходы MetricsMiddleware на запрос.
+
+Запуск: python -m benchmarks.bench_metrics --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from app.metrics import MetricsMiddleware, RequestMetrics
+
+from .bench_security_headers import health, measure
+
+
+async def main(requests: int) -> dict:
+    bare = Starlette(routes=[Route("/health", health)])
+    metered = Starlette(routes=[Route("/health", health)])
+    metrics = RequestMetrics()
+    metered.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    result = {
+        "no_middleware": await measure(bare, requests),
+        "metrics_middleware": await measure(metered, requests),
+    }
+    result["overhead_us"] = round(
+        result["metrics_middleware"]["us_per_request"]
+        - result["no_middleware"]["us_per_request"],
+        2,
+    )
+    result["render_lines"] = sum(1 for _ in metrics.render())
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.requests)), indent=2))
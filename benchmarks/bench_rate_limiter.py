@@ -0,0 +1,57 @@
+"""Пропускная способность и память SlidingWindowLimiter.
+
+Запуск: python -m benchmarks.bench_rate_limiter --clients 1000000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.rate_limit import SlidingWindowLimiter
+
+
+def throughput(limiter: SlidingWindowLimiter, keys: list[str]) -> float:
+    started = time.perf_counter()
+    for key in keys:
+        limiter.hit(key)
+    return round(len(keys) / (time.perf_counter() - started), 1)
+
+
+def main(clients: int, max_clients: int) -> dict:
+    hot_keys = ["10.0.0.1"] * 200_000
+    distinct = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+
+    distinct_rps = throughput(
+        SlidingWindowLimiter(limit=1000, period=3600, max_clients=max_clients),
+        distinct,
+    )
+
+    # память отдельным проходом: tracemalloc сильно замедляет сами вызовы
+    tracemalloc.start()
+    limiter = SlidingWindowLimiter(limit=1000, period=3600, max_clients=max_clients)
+    baseline = tracemalloc.get_traced_memory()[0]
+    for key in distinct:
+        limiter.hit(key)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "hot_client_hits_per_s": throughput(
+            SlidingWindowLimiter(limit=10**9, period=60), hot_keys
+        ),
+        "distinct_client_hits_per_s": distinct_rps,
+        "distinct_clients": clients,
+        "tracked_clients": len(limiter),
+        "evicted": limiter.evicted,
+        "memory_mb": round((current - baseline) / 2**20, 1),
+        "peak_memory_mb": round((peak - baseline) / 2**20, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    parser.add_argument("--max-clients", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(main(args.clients, args.max_clients), indent=2))
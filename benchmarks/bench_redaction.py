@@ -0,0 +1,53 @@
+"""sanitize_error_detail: пять последовательных re.sub против одного прохода.
+
+Запуск: python -m benchmarks.bench_redaction
+"""
+
+import json
+import re
+import timeit
+
+from app.redaction import redactor
+
+
+def legacy_sanitize(detail: str) -> str:
+    sensitive_patterns = [
+        (r"password[^=]*=[^,]*", "password=***"),
+        (r'("password"\s*:\s*)"[^"]*"', r'\1"***"'),
+        (r"(?i)token[^=]*=[^,]*", "token=***"),
+        (r"(?i)secret[^=]*=[^,]*", "secret=***"),
+        (r"(?i)key[^=]*=[^,]*", "key=***"),
+    ]
+    sanitized_detail = detail
+    for pattern, replacement in sensitive_patterns:
+        sanitized_detail = re.sub(pattern, replacement, sanitized_detail)
+    return sanitized_detail
+
+
+def payload(size: int, with_secret: bool) -> str:
+    """Типичная деталь 4xx: эхо тела запроса с ошибкой валидации"""
+    body = {"name": "user", "email": "user@example.com", "comment": ""}
+    if with_secret:
+        body["password"] = "SuperSecret123"  # noqa: S105 — тестовые данные
+    text = "Invalid request body: " + json.dumps(body)
+    return (text + " ") * max(1, size // len(text))
+
+
+def main() -> dict:
+    result = {}
+    for size in (128, 1024, 16384):
+        for with_secret in (False, True):
+            detail = payload(size, with_secret)
+            number = max(200, 2_000_000 // len(detail))
+            legacy = timeit.timeit(lambda d=detail: legacy_sanitize(d), number=number)
+            engine = timeit.timeit(lambda d=detail: redactor.redact(d), number=number)
+            result[f"{len(detail)}b_{'secret' if with_secret else 'clean'}"] = {
+                "legacy_us": round(legacy / number * 1e6, 2),
+                "single_pass_us": round(engine / number * 1e6, 2),
+                "speedup": round(legacy / engine, 2),
+            }
+    return result
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(), indent=2))
@@ -0,0 +1,131 @@
+"""Накладные расходы SecurityHeadersMiddleware: BaseHTTPMiddleware против чистого ASGI.
+
+Оба варианта оборачивают одно и то же минимальное приложение и вызываются
+напрямую через ASGI, без сети, чтобы в замер попадал только middleware.
+
+Запуск: python -m benchmarks.bench_security_headers --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.security_headers import SecurityHeadersMiddleware
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Прежняя реализация — словарь заголовков собирается на каждый запрос"""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+
+        security_headers = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+            "Content-Security-Policy": "default-src 'self'; script-src 'self' "
+            "'unsafe-inline' https://cdn.jsdelivr.net; style-src 'self' "
+            "'unsafe-inline' https://cdn.jsdelivr.net; img-src 'self' "
+            "data: https://fastapi.tiangolo.com; font-src 'self' https://cdn.jsdelivr.net;",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "Permissions-Policy": "geolocation=(), microphone=()",
+        }
+
+        path = request.url.path
+        if not path.startswith(("/docs", "/redoc", "/openapi.json")):
+            for header, value in security_headers.items():
+                response.headers[header] = value
+        else:
+            docs_headers = {
+                "X-Content-Type-Options": "nosniff",
+                "X-Frame-Options": "DENY",
+            }
+            for header, value in docs_headers.items():
+                response.headers[header] = value
+
+        headers_to_remove = ["server", "x-powered-by"]
+        for header in headers_to_remove:
+            if header in response.headers:
+                del response.headers[header]
+
+        response.headers["X-Process-Time"] = str(process_time)
+
+        return response
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+def build_app(middleware) -> Starlette:
+    app = Starlette(routes=[Route("/health", health)])
+    app.add_middleware(middleware)
+    return app
+
+
+async def call(app, scope: dict) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(scope), receive, send)
+
+
+async def measure(app, requests: int) -> dict:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/health",
+        "raw_path": b"/health",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    for _ in range(200):
+        await call(app, scope)
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, scope)
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": round(requests / elapsed, 1),
+        "us_per_request": round(elapsed / requests * 1e6, 2),
+    }
+
+
+async def main(requests: int) -> dict:
+    result = {
+        "no_middleware": await measure(
+            Starlette(routes=[Route("/health", health)]), requests
+        ),
+        "base_http_middleware": await measure(
+            build_app(LegacySecurityHeadersMiddleware), requests
+        ),
+        "pure_asgi": await measure(build_app(SecurityHeadersMiddleware), requests),
+    }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.requests)), indent=2))
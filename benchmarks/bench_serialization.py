@@ -0,0 +1,100 @@
+"""Стоимость сериализации списка пользователей на строку: было и стало.
+
+before — ORM-объекты User, jsonable_encoder и JSONResponse (json.dumps), как
+отдавал GET /users до response_model. after — кортежи колонок, словари и
+ORJSONResponse. Отдельно меряется полный путь с выборкой из SQLite-файла.
+
+Запуск: python -m benchmarks.bench_serialization --rows 10000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Base, User
+
+
+def before(users: list[User]) -> bytes:
+    return JSONResponse(jsonable_encoder(users)).body
+
+
+def after(rows) -> bytes:
+    return ORJSONResponse(
+        [
+            {"id": r.id, "username": r.username, "email": r.email, "version": r.version}
+            for r in rows
+        ]
+    ).body
+
+
+def per_row_us(func, rows: int, repeat: int) -> float:
+    func()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return round(best / rows * 1e6, 3)
+
+
+def main(rows: int, repeat: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "password": "$2b$12$" + "x" * 53,
+                }
+                for i in range(rows)
+            ],
+        )
+
+    columns = select(User.id, User.username, User.email, User.version)
+    with Session(engine) as session:
+        users = list(session.scalars(select(User)))
+        tuples = session.execute(columns).all()
+        result = {
+            "rows": rows,
+            "serialize_only_us_per_row": {
+                "before": per_row_us(lambda: before(users), rows, repeat),
+                "after": per_row_us(lambda: after(tuples), rows, repeat),
+            },
+        }
+
+    def fetch_before() -> bytes:
+        with Session(engine) as session:
+            return before(list(session.scalars(select(User))))
+
+    def fetch_after() -> bytes:
+        with Session(engine) as session:
+            return after(session.execute(columns).all())
+
+    result["fetch_and_serialize_us_per_row"] = {
+        "before": per_row_us(fetch_before, rows, repeat),
+        "after": per_row_us(fetch_after, rows, repeat),
+    }
+    for stage in ("serialize_only_us_per_row", "fetch_and_serialize_us_per_row"):
+        timings = result[stage]
+        timings["speedup"] = round(timings["before"] / timings["after"], 1)
+    engine.dispose()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(main(args.rows, args.repeat), indent=2))
@@ -0,0 +1,83 @@
+"""Холодный старт: импорт app.main -> первый 200 OK на /health и /users.
+
+Каждый прогон — отдельный интерпретатор и новый SQLite-файл (fresh) либо уже
+созданная база (existing). Время считается без импорта httpx самого стенда.
+
+Запуск: python -m benchmarks.bench_startup --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CHILD = """
+import asyncio, json, time
+import httpx
+
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+
+async def first_requests():
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as c:
+            assert (await c.get("/health")).status_code == 200
+            health = time.perf_counter()
+            assert (await c.get("/users")).status_code == 200
+            users = time.perf_counter()
+    return health, users
+
+
+health, users = asyncio.run(first_requests())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_health_ms": (health - started) * 1000,
+    "first_users_ms": (users - started) * 1000,
+}))
+"""
+
+
+def run_once(database: Path) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    output = subprocess.run(  # noqa: S603 — фиксированная команда стенда
+        [sys.executable, "-c", CHILD],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: list[dict]) -> dict:
+    return {
+        key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]
+    }
+
+
+def main(runs: int) -> dict:
+    workdir = Path(tempfile.mkdtemp())
+    fresh = [run_once(workdir / f"fresh{i}.db") for i in range(runs)]
+    existing_db = workdir / "existing.db"
+    run_once(existing_db)
+    existing = [run_once(existing_db) for _ in range(runs)]
+    return {
+        "runs": runs,
+        "fresh_db": summarize(fresh),
+        "existing_db": summarize(existing),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(main(args.runs), indent=2))
@@ -0,0 +1,262 @@
+"""Нагрузочный тест /users для NFR-03 (p95 ≤ 300 ms при 50 RPS).
+
+Гоняет настоящее приложение app.main:app внутри процесса через ASGI
+(httpx.ASGITransport) с открытой моделью нагрузки: запрос i стартует в
+t0 + i / rate независимо от того, завершились ли предыдущие, а задержка
+считается от запланированного момента старта. Так очередь внутри
+приложения не прячет задержки (coordinated omission).
+
+База — временный SQLite-файл, заранее заполненный --rows пользователями.
+Запросы идут с пула клиентских IP, чтобы замерять приложение, а не
+срабатывание rate limit на одном адресе.
+
+Запуск:
+    python -m benchmarks.loadtest --rate 50 --duration 30 --rows 10000
+    BCRYPT_ROUNDS=4 python -m benchmarks.loadtest \
+        --baseline benchmarks/baselines/nfr03-fast-hash.json
+    BCRYPT_ROUNDS=4 python -m benchmarks.loadtest \
+        --write-baseline benchmarks/baselines/nfr03-fast-hash.json
+
+Baseline nfr03-fast-hash.json записан с 4 раундами bcrypt: он ловит регрессии
+в остальном коде запросов, но не измеряет NFR-03 в продовой конфигурации.
+Проверка NFR-03 — прогон без BCRYPT_ROUNDS (12 раундов) без --baseline.
+
+Код возврата 1, если p95 выше порога NFR-03, доля ошибок выше --max-error-rate
+или p95 хуже сохранённого baseline больше чем на --tolerance (но не меньше
+--slack-ms). Baseline, записанный с другой конфигурацией, тоже считается
+провалом: сравнивать такие прогоны бессмысленно.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+NFR03_P95_MS = 300.0
+
+DEFAULT_MIX = {"list": 40, "get": 40, "create": 10, "update": 5, "delete": 5}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 2)
+
+
+def prepare_database(rows: int) -> str:
+    """Окружение задаётся до импорта app: движок создаётся при импорте"""
+    path = Path(tempfile.mkdtemp()) / "loadtest.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    import bcrypt
+    from sqlalchemy import insert
+
+    from app.database import engine
+    from app.models import Base, User
+
+    Base.metadata.create_all(bind=engine)
+    password = bcrypt.hashpw(b"Pass12345", bcrypt.gensalt(4)).decode()
+    with engine.begin() as conn:
+        for start in range(0, rows, 5000):
+            conn.execute(
+                insert(User),
+                [
+                    {
+                        "username": f"seed{i}",
+                        "email": f"seed{i}@example.com",
+                        "password": password,
+                    }
+                    for i in range(start, min(rows, start + 5000))
+                ],
+            )
+    return str(path)
+
+
+class Workload:
+    def __init__(self, rows: int, mix: dict[str, int], seed: int):
+        self.random = random.Random(seed)  # noqa: S311 — воспроизводимая нагрузка
+        self.ids = list(range(1, rows + 1))
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.created = 0
+
+    def next_request(self) -> tuple[str, str, str, dict | None]:
+        operation = self.random.choices(self.operations, self.weights)[0]
+        if operation in ("get", "update", "delete") and not self.ids:
+            operation = "create"
+
+        if operation == "list":
+            return operation, "GET", "/users", None
+        if operation == "get":
+            return operation, "GET", f"/users/{self.random.choice(self.ids)}", None
+        if operation == "create":
+            self.created += 1
+            name = f"load{self.created}"
+            body = {
+                "name": name,
+                "email": f"{name}@example.com",
+                "password": "Pass12345",
+            }
+            return operation, "POST", "/users", body
+        if operation == "update":
+            user_id = self.random.choice(self.ids)
+            body = {"name": f"upd{user_id}x{self.random.randrange(10**6)}"}
+            return operation, "PUT", f"/users/{user_id}", body
+        user_id = self.ids.pop(self.random.randrange(len(self.ids)))
+        return operation, "DELETE", f"/users/{user_id}", None
+
+
+async def run(rate: float, duration: float, rows: int, mix: dict, seed: int) -> dict:
+    import httpx
+
+    from app.main import app
+
+    clients = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(
+                app=app, client=(f"10.0.{i // 256}.{i % 256}", 1)
+            ),
+            base_url="http://loadtest",
+        )
+        for i in range(256)
+    ]
+    workload = Workload(rows, mix, seed)
+    latencies: dict[str, list[float]] = {name: [] for name in mix}
+    statuses: Counter[int] = Counter()
+    errors = 0
+
+    async def fire(index: int, scheduled: float) -> None:
+        nonlocal errors
+        operation, method, url, body = workload.next_request()
+        client = clients[index % len(clients)]
+        try:
+            response = await client.request(method, url, json=body)
+            statuses[response.status_code] += 1
+            if response.status_code >= 500 or response.status_code == 429:
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies[operation].append(time.perf_counter() - scheduled)
+
+    total = int(rate * duration)
+    tasks = []
+    # ASGITransport не шлёт lifespan-события: без этого пул хэширования
+    # паролей и async-движок не закрываются, и процесс не завершается
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        for i in range(total):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(i, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            await client.aclose()
+
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "config": {
+            "rate": rate,
+            "duration": duration,
+            "rows": rows,
+            "mix": mix,
+            "seed": seed,
+            "bcrypt_rounds": int(os.getenv("BCRYPT_ROUNDS", "12")),
+        },
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "p50_ms": percentile(every, 0.50),
+        "p95_ms": percentile(every, 0.95),
+        "p99_ms": percentile(every, 0.99),
+        "operations": {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+            }
+            for name, values in latencies.items()
+        },
+    }
+
+
+def check(
+    report: dict,
+    baseline: dict | None,
+    tolerance: float,
+    slack_ms: float,
+    max_error_rate: float,
+) -> list[str]:
+    failures = []
+    if report["p95_ms"] > NFR03_P95_MS:
+        failures.append(f"p95 {report['p95_ms']} ms > NFR-03 limit {NFR03_P95_MS} ms")
+    if report["error_rate"] > max_error_rate:
+        failures.append(f"error rate {report['error_rate']} > {max_error_rate}")
+    if baseline is not None:
+        if baseline["config"] != report["config"]:
+            failures.append(
+                f"baseline was recorded with {baseline['config']}, "
+                f"this run used {report['config']}"
+            )
+        # на миллисекундных p95 относительный допуск сам по себе слишком шумный
+        limit = max(baseline["p95_ms"] * (1 + tolerance), baseline["p95_ms"] + slack_ms)
+        if report["p95_ms"] > limit:
+            failures.append(
+                f"p95 {report['p95_ms']} ms regressed beyond baseline "
+                f"{baseline['p95_ms']} ms (limit {limit:.2f} ms)"
+            )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=50.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--write-baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--slack-ms", type=float, default=5.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    prepare_database(args.rows)
+    report = asyncio.run(run(args.rate, args.duration, args.rows, args.mix, args.seed))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    report["failures"] = check(
+        report, baseline, args.tolerance, args.slack_ms, args.max_error_rate
+    )
+    print(json.dumps(report, indent=2))
+
+    if args.write_baseline:
+        args.write_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.write_baseline.write_text(json.dumps(report, indent=2) + "\n")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
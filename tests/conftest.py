@@ -1,5 +1,7 @@
 # tests/conftest.py
 # ruff: noqa: E402
+import asyncio
+import os
 import sys
 from pathlib import Path
 
@@ -7,13 +9,28 @@ ROOT = Path(__file__).resolve().parents[1]  # корень репозитори
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+# bcrypt на 12 раундах слишком медленный для функциональных тестов
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-from app.database import Base, get_db
+from app.cache import user_cache
+from app.database import Base, get_db, to_async_url
 from app.main import app
+from app.metrics import request_metrics
+from app.rate_limit import reset_limiters
+from app.timing import instrument_engine
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_state():
+    """Каждый тест начинает с чистыми лимитами, метриками и пустым кэшем"""
+    reset_limiters()
+    user_cache.clear()
+    request_metrics.reset()
 
 
 @pytest.fixture(scope="session")
@@ -25,20 +42,24 @@ def test_db_engine():
         SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
     )
 
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL))
+    # как у движков приложения: запросы попадают в Server-Timing
+    instrument_engine(async_engine.sync_engine)
+    TestingSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
 
-    def override_get_db():
-        try:
-            db = TestingSessionLocal()
+    async def override_get_db():
+        async with TestingSessionLocal() as db:
             yield db
-        finally:
-            db.close()
 
     app.dependency_overrides[get_db] = override_get_db
 
     Base.metadata.create_all(bind=engine)
     yield engine
+    asyncio.run(async_engine.dispose())
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 
 @pytest.fixture
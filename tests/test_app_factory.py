@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, inspect
+
+from app.database import ensure_schema
+from app.main import create_app, openapi_json
+
+
+def test_create_app_returns_independent_apps():
+    first, second = create_app(), create_app()
+
+    assert first is not second
+    assert {r.path for r in first.routes} == {r.path for r in second.routes}
+
+
+def test_openapi_schema_built_once_and_served_from_cache():
+    app = create_app()
+    calls = []
+    build = app.openapi
+    app.openapi = lambda: calls.append(1) or build()
+
+    with TestClient(app) as client:
+        first = client.get("/openapi.json")
+        second = client.get("/openapi.json")
+
+    assert first.status_code == 200
+    assert first.json()["info"]["title"] == "SecDev Course App"
+    assert first.content == second.content == openapi_json(app)
+    assert calls == [1]
+
+
+def test_docs_pages_point_at_cached_schema():
+    with TestClient(create_app()) as client:
+        for path in ("/docs", "/redoc"):
+            response = client.get(path)
+            assert response.status_code == 200
+            assert "/openapi.json" in response.text
+
+
+def test_ensure_schema_runs_once_per_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+
+    ensure_schema(engine)
+    executed = len(statements)
+    ensure_schema(engine)
+
+    assert executed > 0
+    assert len(statements) == executed
+    assert inspect(engine).has_table("users")
+    engine.dispose()
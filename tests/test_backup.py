@@ -0,0 +1,165 @@
+import gzip
+import json
+import sqlite3
+import threading
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.engine import make_url
+
+from app.backup import (
+    BackupError,
+    BackupScheduler,
+    BackupStats,
+    backup_database,
+    backup_name,
+    database_path,
+    list_backups,
+    main,
+    prune,
+    verify,
+)
+
+NOW = datetime(2026, 10, 17, 3, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "app.db"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, payload BLOB)")
+    conn.executemany("INSERT INTO t (payload) VALUES (?)", [(b"x" * 2000,)] * 2000)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def restore(backup_path, tmp_path) -> sqlite3.Connection:
+    restored = tmp_path / "restored.db"
+    restored.write_bytes(gzip.decompress(backup_path.read_bytes()))
+    return sqlite3.connect(restored)
+
+
+def test_backup_is_compressed_and_restorable(source, tmp_path):
+    result = backup_database(
+        source, tmp_path / "backups", pages=16, step_sleep=0, now=NOW
+    )
+
+    assert Path(result.path) == tmp_path / "backups" / backup_name(NOW)
+    assert result.compressed_bytes < result.database_bytes
+    conn = restore(Path(result.path), tmp_path)
+    assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 2000
+    conn.close()
+
+
+def test_writers_keep_going_during_backup(source, tmp_path):
+    stop = threading.Event()
+    written = []
+
+    def writer():
+        conn = sqlite3.connect(source, timeout=5)
+        while not stop.is_set():
+            conn.execute("INSERT INTO t (payload) VALUES (?)", (b"y" * 100,))
+            conn.commit()
+            written.append(1)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        result = backup_database(source, tmp_path / "b", pages=8, step_sleep=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert written
+    conn = restore(Path(result.path), tmp_path)
+    # согласованный снимок: не меньше исходных строк, целостность проверена
+    assert conn.execute("SELECT count(*) FROM t").fetchone()[0] >= 2000
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    conn.close()
+
+
+def test_prune_keeps_recent_and_foreign_files(tmp_path):
+    for days in (45, 31, 29, 1):
+        (tmp_path / backup_name(NOW - timedelta(days=days))).write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("keep")
+
+    assert prune(tmp_path, 30, NOW) == 2
+    assert [moment for moment, _ in list_backups(tmp_path)] == [
+        NOW - timedelta(days=29),
+        NOW - timedelta(days=1),
+    ]
+    assert (tmp_path / "notes.txt").exists()
+
+
+def test_prune_never_removes_last_backup(tmp_path):
+    (tmp_path / backup_name(NOW - timedelta(days=90))).write_bytes(b"")
+
+    assert prune(tmp_path, 30, NOW) == 0
+
+
+def test_verify_rejects_corrupted_database(source, tmp_path):
+    broken = tmp_path / "broken.db"
+    data = bytearray(source.read_bytes())
+    data[4096 * 3 : 4096 * 3 + 512] = b"\xff" * 512
+    broken.write_bytes(bytes(data))
+
+    with pytest.raises((BackupError, sqlite3.DatabaseError)):
+        verify(broken)
+
+
+def test_scheduler_runs_only_when_due(source, tmp_path):
+    stats = BackupStats()
+    scheduler = BackupScheduler(source, tmp_path / "b", interval=3600, stats=stats)
+
+    assert scheduler.run_once() is not None
+    assert scheduler.run_once() is None
+    assert stats.stats()["completed"] == 1
+    assert stats.stats()["last_compressed_bytes"] > 0
+
+
+def test_scheduler_skips_when_another_process_holds_lock(source, tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    directory = tmp_path / "b"
+    directory.mkdir()
+    scheduler = BackupScheduler(source, directory, stats=BackupStats())
+
+    with (directory / ".lock").open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert scheduler.run_once() is None
+    assert list_backups(directory) == []
+
+
+def test_scheduler_thread_stops(source, tmp_path):
+    scheduler = BackupScheduler(
+        source, tmp_path / "b", check_interval=60, stats=BackupStats()
+    )
+    scheduler.start()
+    scheduler.stop(timeout=10)
+
+    assert not scheduler.is_alive()
+    assert len(list_backups(tmp_path / "b")) == 1
+
+
+def test_cli(source, tmp_path, capsys):
+    assert main(["--database", str(source), "--dir", str(tmp_path / "b")]) == 0
+    assert json.loads(capsys.readouterr().out)["database_bytes"] > 0
+
+    assert main(["--database", str(tmp_path / "missing.db")]) == 1
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "sqlite://",
+        "sqlite:///:memory:",
+        "sqlite:///file:secdev?mode=memory&cache=shared&uri=true",
+        "postgresql://db/app",
+    ],
+)
+def test_database_path_requires_sqlite_file(url):
+    with pytest.raises(BackupError):
+        database_path(make_url(url))
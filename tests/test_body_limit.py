@@ -0,0 +1,120 @@
+import asyncio
+
+from app.body_limit import MAX_BODY_BYTES, BodySizeLimitMiddleware
+from app.main import app
+
+
+def oversized_user() -> dict:
+    return {
+        "name": "big",
+        "email": "big@example.com",
+        "password": "Pass12345" + "x" * MAX_BODY_BYTES,
+    }
+
+
+def chunks(total: int, size: int = 4096):
+    for _ in range(total // size):
+        yield b"x" * size
+
+
+def assert_problem(response, status: int = 413) -> None:
+    assert response.status_code == status
+    body = response.json()
+    assert body["status"] == status
+    assert body["title"] == "payload too large"
+    assert "correlation_id" in body
+
+
+def test_content_length_over_limit_is_rejected(client):
+    response = client.post("/users", json=oversized_user())
+
+    assert_problem(response)
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+
+def test_chunked_body_over_limit_is_rejected(client):
+    response = client.put(
+        "/users/1",
+        content=chunks(MAX_BODY_BYTES * 4),
+        headers={"content-type": "application/json"},
+    )
+
+    assert_problem(response)
+
+
+def test_bulk_route_has_larger_limit(client):
+    items = [
+        {"name": f"bulk{i}", "email": f"bulk{i}@example.com", "password": "x" * 100}
+        for i in range(200)
+    ]
+    response = client.post("/users/bulk", json=items)
+
+    # тело больше общего лимита, но до валидации доходит
+    assert response.status_code == 200
+    assert response.json()["failed"] == 200
+
+
+def test_small_body_passes(client):
+    response = client.put("/users/999999", json={"name": "nobody"})
+
+    assert response.status_code == 404
+
+
+def run_asgi(middleware, headers, body_chunks):
+    """Прогоняет middleware без сервера; возвращает ответ и число прочитанных чанков"""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True}
+        for chunk in body_chunks
+    ] + [{"type": "http.request", "body": b"", "more_body": False}]
+    consumed = 0
+    sent = []
+
+    async def receive():
+        nonlocal consumed
+        consumed += 1
+        return messages[consumed - 1]
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/upload",
+        "headers": headers,
+        "query_string": b"",
+        "app": app,
+    }
+    asyncio.run(middleware(scope, receive, send))
+    return sent, consumed
+
+
+def test_declared_oversize_never_reaches_app():
+    async def inner(scope, receive, send):
+        raise AssertionError("app must not be called")
+
+    sent, consumed = run_asgi(
+        BodySizeLimitMiddleware(inner, default=10),
+        [(b"content-length", b"11")],
+        [b"x" * 11],
+    )
+
+    assert sent[0]["status"] == 413
+    assert consumed == 0
+
+
+def test_streaming_read_stops_at_limit():
+    async def inner(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message["body"]
+            if not message["more_body"]:
+                break
+
+    sent, consumed = run_asgi(
+        BodySizeLimitMiddleware(inner, default=10), [], [b"x" * 6] * 100
+    )
+
+    assert sent[0]["status"] == 413
+    assert consumed == 2
@@ -0,0 +1,85 @@
+from app.cache import NOT_FOUND, TTLCache, user_cache
+
+
+class TestTTLCache:
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(1, "a", now=0)
+        cache.set(2, "b", now=0)
+        cache.get(1, now=1)
+        cache.set(3, "c", now=1)
+
+        assert cache.get(2, now=1) is None
+        assert cache.get(1, now=1) == "a"
+        assert cache.evictions == 1
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(maxsize=10, ttl=5)
+        cache.set(1, "a", now=0)
+
+        assert cache.get(1, now=4.9) == "a"
+        assert cache.get(1, now=5.0) is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_negative_caching_disabled_by_zero_ttl(self):
+        cache = TTLCache(maxsize=10, ttl=5, negative_ttl=0)
+        cache.set(1, NOT_FOUND, now=0)
+
+        assert cache.get(1, now=0) is None
+        assert len(cache) == 0
+
+
+class TestUserCacheEndpoints:
+    def test_hot_read_served_from_cache(self, client):
+        user_id = client.post(
+            "/users",
+            json={
+                "name": "cached",
+                "email": "cached@example.com",
+                "password": "Pass12345",
+            },
+        ).json()["id"]
+
+        client.get(f"/users/{user_id}")
+        hits = user_cache.hits
+        response = client.get(f"/users/{user_id}")
+
+        assert response.status_code == 200
+        assert response.json()["username"] == "cached"
+        assert user_cache.hits == hits + 1
+
+    def test_update_and_delete_invalidate(self, client):
+        user_id = client.post(
+            "/users",
+            json={
+                "name": "stale",
+                "email": "stale@example.com",
+                "password": "Pass12345",
+            },
+        ).json()["id"]
+        client.get(f"/users/{user_id}")
+
+        client.put(f"/users/{user_id}", json={"name": "fresh"})
+        assert client.get(f"/users/{user_id}").json()["username"] == "fresh"
+
+        client.delete(f"/users/{user_id}")
+        assert client.get(f"/users/{user_id}").status_code == 404
+
+    def test_negative_entry_cleared_on_create(self, client):
+        previous = client.post(
+            "/users",
+            json={
+                "name": "early",
+                "email": "early@example.com",
+                "password": "Pass12345",
+            },
+        ).json()
+        missing_id = previous["id"] + 1
+        assert client.get(f"/users/{missing_id}").status_code == 404
+
+        created = client.post(
+            "/users",
+            json={"name": "late", "email": "late@example.com", "password": "Pass12345"},
+        ).json()
+        assert created["id"] == missing_id
+        assert client.get(f"/users/{missing_id}").status_code == 200
@@ -0,0 +1,170 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from sqlalchemy import delete, insert
+
+from app.compress import ZSTD_AVAILABLE, CompressionMiddleware, negotiate
+from app.models import User
+
+
+@pytest.fixture
+def users(client, test_db_engine):
+    """Страница /users заведомо больше порога сжатия"""
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(User))
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": f"zip{i}",
+                    "email": f"zip{i}@example.com",
+                    "password": "hash",
+                }
+                for i in range(50)
+            ],
+        )
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("gzip, deflate", "gzip"),
+        ("zstd, gzip", "zstd" if ZSTD_AVAILABLE else "gzip"),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("identity", None),
+        ("*", "zstd" if ZSTD_AVAILABLE else "gzip"),
+        ("", None),
+    ],
+)
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_list_is_gzipped_with_security_headers(client, users):
+    response = client.get("/users?limit=50", headers={"accept-encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert len(response.json()) == 50
+
+
+def test_identity_and_small_bodies_are_not_compressed(client, users):
+    plain = client.get("/users?limit=50", headers={"accept-encoding": "identity"})
+    small = client.get("/health", headers={"accept-encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+    assert "content-encoding" not in small.headers
+
+
+def test_conditional_get_with_compressed_etag(client, users):
+    headers = {"accept-encoding": "gzip"}
+    first = client.get("/users?limit=50", headers=headers)
+    etag = first.headers["etag"]
+    assert etag.endswith('-gzip"')
+
+    second = client.get("/users?limit=50", headers={**headers, "if-none-match": etag})
+
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+
+
+def test_export_stream_is_compressed(client, users):
+    response = client.get("/users/export", headers={"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 50
+
+
+@pytest.mark.skipif(not ZSTD_AVAILABLE, reason="нет модуля zstd")
+def test_zstd_when_available(client, users):
+    zstandard = pytest.importorskip("zstandard")
+
+    with client.stream(
+        "GET", "/users?limit=50", headers={"accept-encoding": "zstd"}
+    ) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "zstd"
+    assert (
+        zstandard.ZstdDecompressor().decompressobj().decompress(raw).startswith(b"[{")
+    )
+
+
+def run_asgi(middleware, accept_encoding: bytes = b"gzip"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding)],
+    }
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_stream_is_compressed_chunk_by_chunk():
+    lines = [b'{"id": %d, "name": "user"}\n' % i * 100 for i in range(3)]
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            }
+        )
+        for i, line in enumerate(lines):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": line,
+                    "more_body": i < len(lines) - 1,
+                }
+            )
+
+    sent = run_asgi(CompressionMiddleware(app))
+    bodies = [m["body"] for m in sent[1:]]
+
+    assert len(bodies) == 3
+    # каждая часть распаковывается сразу, не дожидаясь конца потока
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(bodies[0]) == lines[0]
+    assert decoder.decompress(bodies[1]) == lines[1]
+    assert gzip.decompress(b"".join(bodies)) == b"".join(lines)
+
+
+def test_already_encoded_body_is_untouched():
+    body = gzip.compress(b"x" * 5000)
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-encoding", b"gzip"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    sent = run_asgi(CompressionMiddleware(app))
+
+    assert sent[1]["body"] == body
+    assert dict(sent[0]["headers"])[b"content-encoding"] == b"gzip"
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import (
+    ASYNC_DATABASE_URL,
+    SQLITE_PRAGMA_PROFILES,
+    _on_connect,
+    add_missing_columns,
+    add_missing_indexes,
+    apply_sqlite_pragmas,
+    resolve_pragma_profile,
+)
+
+# как SQLite возвращает значения, заданные строками
+PRAGMA_READBACK = {
+    "journal_mode": {"WAL": "wal"},
+    "synchronous": {"NORMAL": 1, "FULL": 2},
+    "temp_store": {"MEMORY": 2},
+    "foreign_keys": {"ON": 1},
+}
+
+
+@pytest.mark.parametrize("profile", sorted(SQLITE_PRAGMA_PROFILES))
+def test_pragma_profile_applied(tmp_path, profile):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    event.listen(
+        engine,
+        "connect",
+        lambda conn, record: apply_sqlite_pragmas(conn, profile),
+    )
+
+    with engine.connect() as conn:
+        for name, value in SQLITE_PRAGMA_PROFILES[profile].items():
+            actual = conn.execute(text(f"PRAGMA {name}")).scalar()
+            expected = PRAGMA_READBACK.get(name, {}).get(value, value)
+            assert actual == expected, name
+    engine.dispose()
+
+
+def test_async_engine_uses_pragma_profile():
+    engine = create_async_engine(ASYNC_DATABASE_URL)
+    event.listen(engine.sync_engine, "connect", _on_connect)
+
+    async def read_busy_timeout():
+        try:
+            async with engine.connect() as conn:
+                return (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(read_busy_timeout()) == 5000
+
+
+def test_unknown_pragma_profile_rejected():
+    with pytest.raises(ValueError, match="Unknown SQLITE_PRAGMA_PROFILE 'reckless'"):
+        resolve_pragma_profile("reckless")
+
+
+def test_add_missing_columns_upgrades_old_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, "
+                "email VARCHAR, password VARCHAR)"
+            )
+        )
+        conn.execute(text("INSERT INTO users (username) VALUES ('legacy')"))
+
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM users")).scalar() == 1
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(users)"))}
+    assert {"ix_users_username_nocase", "ix_users_email_nocase"} <= indexes
+    engine.dispose()
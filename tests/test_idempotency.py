@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.main import app as main_app
+from app.models import Base, IdempotencyRecord, User
+
+
+def new_user(name: str) -> dict:
+    return {"name": name, "email": f"{name}@example.com", "password": "Pass12345"}
+
+
+def key_headers() -> dict[str, str]:
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+@pytest.fixture
+def clean(test_db_engine):
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(User))
+        conn.execute(delete(IdempotencyRecord))
+    return test_db_engine
+
+
+def count_users(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(User)).scalar()
+
+
+def test_retry_replays_stored_response(client, clean):
+    headers = key_headers()
+    first = client.post("/users", json=new_user("idem"), headers=headers)
+    retry = client.post("/users", json=new_user("idem"), headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert count_users(clean) == 1
+
+
+def test_key_reuse_with_other_body_is_rejected(client, clean):
+    headers = key_headers()
+    client.post("/users", json=new_user("first"), headers=headers)
+    response = client.post("/users", json=new_user("second"), headers=headers)
+
+    assert response.status_code == 422
+    assert response.json()["title"] == "idempotency key reused"
+    assert count_users(clean) == 1
+
+
+def test_client_errors_are_replayed_too(client, clean):
+    client.post("/users", json=new_user("taken"))
+    headers = key_headers()
+    first = client.post("/users", json=new_user("taken"), headers=headers)
+    retry = client.post("/users", json=new_user("taken"), headers=headers)
+
+    assert first.status_code == retry.status_code == 400
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+def test_bulk_is_idempotent(client, clean):
+    headers = key_headers()
+    items = [new_user("bulk1"), new_user("bulk2")]
+    first = client.post("/users/bulk", json=items, headers=headers)
+    retry = client.post("/users/bulk", json=items, headers=headers)
+
+    assert first.json()["created"] == 2
+    assert retry.json() == first.json()
+    assert count_users(clean) == 2
+
+
+def test_invalid_key_is_rejected(client, clean):
+    response = client.post(
+        "/users", json=new_user("longkey"), headers={"Idempotency-Key": "k" * 256}
+    )
+
+    assert response.status_code == 400
+    assert count_users(clean) == 0
+
+
+@pytest.fixture
+def store(tmp_path):
+    url = f"sqlite:///{tmp_path / 'idem.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine, tables=[IdempotencyRecord.__table__])
+    sync_engine.dispose()
+    engine = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:"))
+    yield IdempotencyStore(engine, ttl=60, lock_timeout=5, max_keys=3)
+    asyncio.run(engine.dispose())
+
+
+def counting_app(statuses: list[int], delay: float = 0.0):
+    """ASGI-приложение, отвечающее по очереди статусами из statuses"""
+    calls = []
+
+    async def app(scope, receive, send):
+        body = (await receive())["body"]
+        calls.append(body)
+        await asyncio.sleep(delay)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"call %d" % len(calls)})
+
+    return app, calls
+
+
+async def post_all(middleware, *keys: str, body: bytes = b"{}"):
+    async def asgi(scope, receive, send):
+        # ответы problem+json смотрят на app.debug, как внутри приложения
+        await middleware({**scope, "app": main_app}, receive, send)
+
+    transport = httpx.ASGITransport(app=asgi)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        return await asyncio.gather(
+            *(
+                client.post("/users", content=body, headers={"Idempotency-Key": key})
+                for key in keys
+            )
+        )
+
+
+def test_concurrent_duplicates_wait_for_first(store):
+    app, calls = counting_app([201], delay=0.2)
+    middleware = IdempotencyMiddleware(app, paths=["/users"], store=store)
+
+    responses = asyncio.run(post_all(middleware, "k", "k", "k"))
+
+    assert len(calls) == 1
+    assert [r.status_code for r in responses] == [201, 201, 201]
+    assert {r.text for r in responses} == {"call 1"}
+    assert store.stats()["replayed"] == 2
+
+
+def test_server_errors_are_not_stored(store):
+    app, calls = counting_app([503, 201])
+    middleware = IdempotencyMiddleware(app, paths=["/users"], store=store)
+
+    async def scenario():
+        first = await post_all(middleware, "k")
+        retry = await post_all(middleware, "k")
+        return first[0], retry[0]
+
+    first, retry = asyncio.run(scenario())
+
+    assert (first.status_code, retry.status_code) == (503, 201)
+    assert len(calls) == 2
+
+
+def test_request_in_another_worker_times_out_with_409(store):
+    app, calls = counting_app([201])
+    middleware = IdempotencyMiddleware(app, paths=["/users"], store=store, wait=0.2)
+
+    async def scenario():
+        # ключ уже захвачен другим процессом и не освобождается
+        await store.claim("/users:k", hashlib.sha256(b"{}").hexdigest())
+        return (await post_all(middleware, "k"))[0]
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+    assert calls == []
+
+
+def test_expired_keys_are_reclaimed_and_purged(store):
+    async def scenario():
+        assert await store.claim("a", "f", now=0) is None
+        await store.complete("a", 200, [], b"old", now=0)
+        # ответ ещё жив
+        assert (await store.claim("a", "f", now=30)).body == b"old"
+        # TTL 60 с истёк: ключ снова свободен
+        assert await store.claim("a", "f", now=61) is None
+        for key in "bcde":
+            await store.claim(key, "f", now=100)
+            await store.complete(key, 200, [], b"", now=100)
+        await store.purge(now=100)
+        async with store.engine.connect() as conn:
+            return (
+                await conn.execute(select(func.count()).select_from(IdempotencyRecord))
+            ).scalar()
+
+    assert asyncio.run(scenario()) == 3
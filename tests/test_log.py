@@ -0,0 +1,129 @@
+import io
+import logging
+import threading
+
+import orjson
+from fastapi.testclient import TestClient
+
+from app.log import DroppingQueueHandler, JSONFormatter, LogPipeline
+from app.main import app
+
+
+def make_record(**extra) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "app.errors", logging.ERROR, __file__, 1, "Error %s: %s", (404, "x"), None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+class BlockingStream(io.StringIO):
+    """Поток вывода, который не пишет, пока его не отпустят"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text: str) -> int:
+        self.release.wait()
+        return super().write(text)
+
+
+def test_json_formatter_carries_extra_fields():
+    record = make_record(
+        correlation_id="abc", path="/users/1", method="GET", status=404
+    )
+    entry = orjson.loads(JSONFormatter().format(record))
+
+    assert entry["message"] == "Error 404: x"
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "app.errors"
+    assert entry["correlation_id"] == "abc"
+    assert entry["path"] == "/users/1"
+    assert entry["method"] == "GET"
+    assert entry["status"] == 404
+    assert "args" not in entry and "lineno" not in entry
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(maxsize=2)
+    for _ in range(5):
+        handler.handle(make_record())
+
+    assert handler.stats() == {
+        "queue_depth": 2,
+        "queue_size": 2,
+        "enqueued": 2,
+        "dropped": 3,
+    }
+
+
+def test_slow_sink_does_not_stall_callers():
+    stream = BlockingStream()
+    pipeline = LogPipeline(level="INFO", queue_size=10, stream=stream)
+    logger = logging.getLogger("tests.log.slow")
+    pipeline.start()
+    try:
+        for i in range(100):
+            logger.info("event %d", i)
+        stats = pipeline.stats()
+        # поток вывода держит одну запись, ещё 10 в очереди
+        assert stats["enqueued"] <= 11
+        assert stats["dropped"] == 100 - stats["enqueued"]
+    finally:
+        stream.release.set()
+        pipeline.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == stats["enqueued"]
+    assert orjson.loads(lines[0])["message"] == "event 0"
+
+
+def test_pipeline_redacts_and_flushes_on_stop():
+    stream = io.StringIO()
+    pipeline = LogPipeline(level="INFO", stream=stream)
+    pipeline.start()
+    logging.getLogger("tests.log").warning("login password=%s", "hunter2")
+    pipeline.stop()
+
+    entry = orjson.loads(stream.getvalue())
+    assert entry["message"] == "login password=***"
+    assert "hunter2" not in stream.getvalue()
+
+
+def test_error_log_redacted_only_in_listener():
+    # на логгере нет своего фильтра: маскирование не идёт в event loop
+    logger = logging.getLogger("app.errors")
+    assert not logger.filters
+
+    stream = io.StringIO()
+    pipeline = LogPipeline(level="INFO", stream=stream)
+    pipeline.start()
+    logger.error("Error %s: %s", 400, "bad token=abc123")
+    pipeline.stop()
+
+    entry = orjson.loads(stream.getvalue())
+    assert entry["message"] == "Error 400: bad token=***"
+    assert "abc123" not in stream.getvalue()
+
+
+def test_pipeline_restores_handlers():
+    root = logging.getLogger()
+    access = logging.getLogger("uvicorn.access")
+    before = (list(root.handlers), list(access.handlers), root.level)
+
+    pipeline = LogPipeline(stream=io.StringIO())
+    pipeline.start()
+    assert access.handlers == [pipeline.handler]
+    pipeline.stop()
+
+    assert (list(root.handlers), list(access.handlers), root.level) == before
+
+
+def test_lifespan_starts_logging_and_exports_metrics(test_db_engine):
+    with TestClient(app) as client:
+        client.get("/users/999999")
+        body = client.get("/metrics").text
+
+    assert "log_enqueued_total" in body
+    assert "log_dropped_total 0" in body
@@ -0,0 +1,111 @@
+import re
+
+from app.metrics import LATENCY_BUCKETS, RequestMetrics, stats_metrics
+
+
+def sample(text: str, name: str, **labels: str) -> float:
+    selector = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(
+        rf"^{re.escape(name)}{re.escape('{' + selector + '}') if labels else ''} (\S+)$",
+        text,
+        re.MULTILINE,
+    )
+    assert match, f"{name}{labels} not found"
+    return float(match.group(1))
+
+
+class TestRequestMetrics:
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = RequestMetrics()
+        for seconds in (0.001, 0.02, 0.02, 20.0):
+            metrics.observe("GET", "/users", 200, seconds)
+        text = "\n".join(metrics.render())
+
+        labels = {"method": "GET", "route": "/users"}
+        assert (
+            sample(text, "http_request_duration_seconds_bucket", **labels, le="0.005")
+            == 1
+        )
+        assert (
+            sample(text, "http_request_duration_seconds_bucket", **labels, le="0.025")
+            == 3
+        )
+        assert (
+            sample(
+                text,
+                "http_request_duration_seconds_bucket",
+                **labels,
+                le=str(LATENCY_BUCKETS[-1]),
+            )
+            == 3
+        )
+        assert (
+            sample(text, "http_request_duration_seconds_bucket", **labels, le="+Inf")
+            == 4
+        )
+        assert sample(text, "http_request_duration_seconds_count", **labels) == 4
+        assert sample(text, "http_request_duration_seconds_sum", **labels) == 20.041
+
+    def test_labelled_stats(self):
+        text = "\n".join(
+            stats_metrics(
+                "rate_limiter",
+                {("limiter", "users"): {"clients": 2, "rejected": 1}},
+                counters=("rejected",),
+            )
+        )
+
+        assert "# TYPE rate_limiter_rejected_total counter" in text
+        assert sample(text, "rate_limiter_clients", limiter="users") == 2
+        assert sample(text, "rate_limiter_rejected_total", limiter="users") == 1
+
+
+class TestMetricsEndpoint:
+    def test_route_template_not_raw_path(self, client):
+        client.get("/users/101")
+        client.get("/users/202")
+        text = client.get("/metrics").text
+
+        assert (
+            sample(
+                text,
+                "http_requests_total",
+                method="GET",
+                route="/users/{user_id}",
+                status="404",
+            )
+            == 2
+        )
+        assert "/users/101" not in text
+
+    def test_unmatched_paths_collapsed(self, client):
+        client.get("/no/such/path/1")
+        client.get("/no/such/path/2")
+        text = client.get("/metrics").text
+
+        assert (
+            sample(
+                text,
+                "http_requests_total",
+                method="GET",
+                route="<unmatched>",
+                status="404",
+            )
+            == 2
+        )
+
+    def test_component_metrics_exposed(self, client):
+        client.get("/users/1")
+        response = client.get("/metrics")
+
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert sample(text, "user_cache_misses_total") >= 1
+        assert sample(text, "rate_limiter_allowed_total", limiter="users") >= 1
+        assert sample(text, "db_pool_size", engine="sync") >= 1
+        assert "password_hasher_queue_depth" in text
+        # сам запрос /metrics ещё выполняется
+        assert sample(text, "http_requests_in_progress", method="GET") == 1
+
+    def test_process_time_header_removed(self, client):
+        assert "x-process-time" not in client.get("/health").headers
@@ -0,0 +1,154 @@
+import asyncio
+
+import bcrypt
+import pytest
+from sqlalchemy import select
+
+from app.errors import RFC7807Error
+from app.models import User
+from app.passwords import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=2, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify(hasher):
+    async def scenario():
+        hashed = await hasher.hash("Pass12345")
+        return hashed, await hasher.verify("Pass12345", hashed)
+
+    hashed, ok = asyncio.run(scenario())
+    assert hashed.startswith("$2b$04$")
+    assert ok
+    assert hasher.stats()["completed"] == 2
+    assert hasher.stats()["queue_depth"] == 0
+
+
+def test_saturated_pool_rejected_with_503(hasher):
+    async def scenario():
+        return await asyncio.gather(
+            *(hasher.hash("Pass12345") for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    errors = [r for r in results if isinstance(r, RFC7807Error)]
+    assert len(errors) == 1
+    assert errors[0].status == 503
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_hash_many_preserves_order():
+    hasher = PasswordHasher(workers=2, max_pending=5, rounds=4)
+    passwords = [f"Pass1234{i}" for i in range(5)]
+    try:
+        hashed = asyncio.run(hasher.hash_many(passwords))
+    finally:
+        hasher.shutdown()
+    assert all(
+        bcrypt.checkpw(p.encode(), h.encode())
+        for p, h in zip(passwords, hashed, strict=True)
+    )
+    assert hasher.stats()["queue_depth"] == 0
+
+
+def test_hash_many_occupies_a_slot_per_password(hasher):
+    async def scenario():
+        batch = asyncio.ensure_future(hasher.hash_many(["Pass12345", "Pass12346"]))
+        await asyncio.sleep(0)
+        # пакет из двух паролей занял всю очередь (max_pending=2)
+        with pytest.raises(RFC7807Error) as exc_info:
+            await hasher.hash("Pass12347")
+        return exc_info.value, await batch
+
+    error, hashed = asyncio.run(scenario())
+    assert error.status == 503
+    assert len(hashed) == 2
+    assert hasher.stats()["queue_depth"] == 0
+
+
+def test_hash_many_larger_than_queue_rejected_with_413(hasher):
+    with pytest.raises(RFC7807Error) as exc_info:
+        asyncio.run(hasher.hash_many([f"Pass1234{i}" for i in range(3)]))
+    assert exc_info.value.status == 413
+    assert hasher.stats()["queue_depth"] == 0
+
+
+def test_created_user_password_is_hashed(client, test_db_engine):
+    response = client.post(
+        "/users",
+        json={
+            "name": "hashed_user",
+            "email": "hashed@example.com",
+            "password": "Pass12345",
+        },
+    )
+    assert response.status_code == 200
+
+    with test_db_engine.connect() as conn:
+        stored = conn.execute(
+            select(User.password).where(User.username == "hashed_user")
+        ).scalar_one()
+    assert stored != "Pass12345"
+    assert bcrypt.checkpw(b"Pass12345", stored.encode())
+
+
+# 100 ASCII-символов и 40 кириллических (80 байт UTF-8): оба длиннее 72 байт
+LONG_PASSWORDS = ["Pass1" + "a" * 95, "Пароль1Ab" + "ж" * 31]
+
+
+@pytest.mark.parametrize("password", LONG_PASSWORDS)
+def test_password_over_72_bytes_rejected_with_422(client, password):
+    assert len(password.encode()) > 72
+    created = client.post(
+        "/users",
+        json={"name": "long_pw", "email": "long_pw@example.com", "password": password},
+    )
+    assert created.status_code == 422
+
+    user = client.post(
+        "/users",
+        json={
+            "name": "long_pw_owner",
+            "email": "long_pw_owner@example.com",
+            "password": "Pass12345",
+        },
+    )
+    assert user.status_code == 200
+    user_id = user.json()["id"]
+    updated = client.put(f"/users/{user_id}", json={"password": password})
+    assert updated.status_code == 422
+
+    # в пакете отклоняется только элемент с длинным паролем
+    bulk = client.post(
+        "/users/bulk",
+        json=[
+            {
+                "name": "long_pw_a",
+                "email": "long_pw_a@example.com",
+                "password": password,
+            },
+            {
+                "name": "long_pw_b",
+                "email": "long_pw_b@example.com",
+                "password": "Pass12345",
+            },
+        ],
+    )
+    assert bulk.status_code == 200
+    assert [r["status"] for r in bulk.json()["results"]] == [422, 201]
+    client.delete(f"/users/{user_id}")
+    client.delete(f"/users/{bulk.json()['results'][1]['user']['id']}")
+
+
+def test_password_of_exactly_72_bytes_accepted(client):
+    password = "Pass1" + "a" * 67
+    response = client.post(
+        "/users",
+        json={"name": "max_pw", "email": "max_pw@example.com", "password": password},
+    )
+    assert response.status_code == 200
+    client.delete(f"/users/{response.json()['id']}")
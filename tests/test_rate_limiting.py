@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.rate_limit import SlidingWindowLimiter, limiters
+
+client = TestClient(app)
+
+
+class TestSlidingWindowLimiter:
+    """Тесты для ADR-002: скользящее окно"""
+
+    def test_rejects_over_limit_within_window(self):
+        limiter = SlidingWindowLimiter(limit=3, period=60)
+        assert [limiter.hit("1.1.1.1", now=0.0 + i) for i in range(3)] == [None] * 3
+
+        retry_after = limiter.hit("1.1.1.1", now=3.0)
+        assert retry_after is not None
+        assert 0 < retry_after <= 120
+        assert limiter.hit("2.2.2.2", now=3.0) is None
+
+    def test_previous_window_weight_decays(self):
+        limiter = SlidingWindowLimiter(limit=10, period=60)
+        for _ in range(10):
+            assert limiter.hit("client", now=50.0) is None
+
+        # в начале следующего окна предыдущее весит почти полностью
+        assert limiter.hit("client", now=61.0) is not None
+        # к середине окна вес предыдущего упал вдвое
+        assert limiter.hit("client", now=90.0) is None
+
+    def test_retry_after_is_enough(self):
+        limiter = SlidingWindowLimiter(limit=5, period=60)
+        for _ in range(5):
+            limiter.hit("client", now=10.0)
+
+        retry_after = limiter.hit("client", now=10.0)
+        assert limiter.hit("client", now=10.0 + retry_after - 1) is not None
+        assert limiter.hit("client", now=10.0 + retry_after) is None
+
+    def test_memory_bounded_by_max_clients(self):
+        limiter = SlidingWindowLimiter(limit=100, period=60, shards=4, max_clients=100)
+        for i in range(10_000):
+            limiter.hit(f"10.0.{i // 256}.{i % 256}", now=1.0)
+
+        assert len(limiter) <= 100
+        assert limiter.evicted >= 9_900
+
+    def test_idle_clients_evicted(self):
+        limiter = SlidingWindowLimiter(limit=100, period=60, shards=1)
+        limiter.hit("idle", now=1.0)
+        limiter.hit("active", now=200.0)
+
+        assert len(limiter) == 1
+
+
+class TestRateLimitedEndpoints:
+    def test_users_limit_returns_429_problem(self, test_db_engine):
+        for _ in range(limiters["users"].limit):
+            assert client.get("/users").status_code == 200
+
+        response = client.get("/users")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+        error_data = response.json()
+        assert error_data["status"] == 429
+        assert "correlation_id" in error_data
+
+    def test_health_not_subject_to_users_limit(self, test_db_engine):
+        for _ in range(limiters["users"].limit + 1):
+            client.get("/users")
+
+        assert client.get("/health").status_code == 200
+
+    def test_service_endpoints_not_subject_to_global_limit(self, test_db_engine):
+        limiter = limiters["global"]
+        for _ in range(limiter.limit):
+            limiter.hit("testclient")
+        assert client.get("/users").status_code == 429
+
+        assert client.get("/health").status_code == 200
+        assert client.get("/metrics").status_code == 200
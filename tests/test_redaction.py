@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+
+from app.errors import sanitize_error_detail
+from app.redaction import RedactingFilter, RedactionEngine
+
+
+@pytest.mark.parametrize(
+    ("detail", "expected"),
+    [
+        ("password=hunter2, user=bob", "password=***, user=bob"),
+        (
+            '{"password": "hunter2", "user": "bob"}',
+            '{"password": "***", "user": "bob"}',
+        ),
+        ("Token=abc123", "token=***"),
+        ("client_secret=s3cr3t, ok", "client_secret=***, ok"),
+        ("api_key=xyz", "api_key=***"),
+        ("nothing to hide", "nothing to hide"),
+    ],
+)
+def test_sanitize_error_detail(detail, expected):
+    assert sanitize_error_detail(detail) == expected
+
+
+def test_sanitize_non_string_detail():
+    assert sanitize_error_detail({"a": 1}) == "{'a': 1}"
+
+
+def test_rules_compiled_once_into_single_pattern():
+    engine = RedactionEngine()
+    engine.register("pin", r"pin=\d+", "pin=***", keyword="pin")
+    engine.register("cvv", r"cvv=\d+", "cvv=***", keyword="cvv")
+
+    pattern = engine.pattern
+    assert engine.redact("pin=1234 cvv=999") == "pin=*** cvv=***"
+    assert engine.pattern is pattern
+
+    engine.register("otp", r"otp=\d+", "otp=***", keyword="otp")
+    assert engine.pattern is not pattern
+
+
+def test_text_without_keywords_returned_as_is():
+    engine = RedactionEngine()
+    engine.register("pin", r"pin=\d+", "pin=***", keyword="pin")
+    text = "nothing sensitive here"
+
+    assert engine.redact(text) is text
+    assert engine._compiled is None
+
+
+def test_logging_filter_masks_formatted_message(caplog):
+    logger = logging.getLogger("tests.redaction")
+    logger.addFilter(RedactingFilter())
+
+    with caplog.at_level(logging.INFO, logger="tests.redaction"):
+        logger.info("login failed: %s", "password=SuperSecret123")
+
+    assert "SuperSecret123" not in caplog.text
+    assert "password=***" in caplog.text
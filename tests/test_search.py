@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, delete, insert
+
+from app.fields import DEFAULT_USER_FIELDS, user_columns
+from app.models import Base, User
+from app.search import NEXT_OFFSET_HEADER, prefix_pattern, search_statement
+
+
+@pytest.fixture
+def users(client, test_db_engine):
+    """База общая на сессию: начинаем с пустой таблицы"""
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(User))
+    for name, email in [
+        ("anna", "anna@example.com"),
+        ("Annabel", "bel@example.com"),
+        ("bob", "ANNA.b@example.com"),
+        ("annika", "annika@example.com"),
+        ("ann_x", "annx@example.com"),
+        ("carl", "carl@example.com"),
+    ]:
+        response = client.post(
+            "/users", json={"name": name, "email": email, "password": "Pass12345"}
+        )
+        assert response.status_code == 200
+
+
+def test_search_prefix_case_insensitive_and_ranked(client, users):
+    response = client.get("/users/search", params={"q": "ANNA"})
+
+    assert response.status_code == 200
+    # точное имя, затем префикс имени, затем префикс email
+    assert [u["username"] for u in response.json()] == ["anna", "Annabel", "bob"]
+    assert "password" not in response.text
+
+
+def test_search_wildcards_are_literal(client, users):
+    assert [u["username"] for u in client.get("/users/search?q=ann_").json()] == [
+        "ann_x"
+    ]
+    assert client.get("/users/search", params={"q": "a%"}).json() == []
+
+
+def test_search_pagination_and_fields(client, users):
+    first = client.get(
+        "/users/search", params={"q": "an", "limit": 2, "fields": "username"}
+    )
+    assert [set(u) for u in first.json()] == [{"id", "username"}] * 2
+    assert first.headers[NEXT_OFFSET_HEADER] == "2"
+
+    rest = client.get("/users/search", params={"q": "an", "limit": 10, "offset": 2})
+    assert NEXT_OFFSET_HEADER not in rest.headers
+    names = [u["username"] for u in first.json()] + [u["username"] for u in rest.json()]
+    assert sorted(names) == sorted(["ann_x", "anna", "Annabel", "annika", "bob"])
+
+
+@pytest.mark.parametrize("params", [{}, {"q": "a"}, {"q": "an", "offset": 100_000}])
+def test_search_validation(client, params):
+    assert client.get("/users/search", params=params).status_code == 422
+
+
+def test_prefix_pattern_escapes():
+    assert prefix_pattern("a%b_c\\") == "a\\%b\\_c\\\\%"
+
+
+def test_search_uses_indexes_not_full_scan(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plan.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {"username": f"user{i}", "email": f"user{i}@example.com"}
+                for i in range(500)
+            ],
+        )
+        conn.exec_driver_sql("ANALYZE")
+
+    stmt = search_statement("User1", user_columns(DEFAULT_USER_FIELDS), 50, 0)
+    compiled = stmt.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as conn:
+        plan = [
+            row[3]
+            for row in conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + compiled.string, params
+            )
+        ]
+        assert len(conn.execute(stmt).all()) == 50
+    engine.dispose()
+
+    assert not [step for step in plan if step.startswith("SCAN")], plan
+    assert any("USING INDEX ix_users_username_nocase" in step for step in plan), plan
+    assert any("USING INDEX ix_users_email_nocase" in step for step in plan), plan
@@ -1,6 +1,10 @@
 from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 
 from app.main import app
+from app.security_headers import SecurityHeadersMiddleware
 
 client = TestClient(app)
 
@@ -93,3 +97,24 @@ class TestSecurityHeaders:
         response = client.get("/health")
         assert "server" not in response.headers
         assert "x-powered-by" not in response.headers
+
+    def test_server_header_from_app_stripped(self):
+        async def leaky(request):
+            return PlainTextResponse(
+                "ok", headers={"Server": "uvicorn", "X-Powered-By": "python"}
+            )
+
+        inner = Starlette(routes=[Route("/leaky", leaky)])
+        inner.add_middleware(SecurityHeadersMiddleware)
+        response = TestClient(inner).get("/leaky")
+
+        assert "server" not in response.headers
+        assert "x-powered-by" not in response.headers
+        assert response.headers["X-Frame-Options"] == "DENY"
+
+    def test_docs_get_reduced_header_set(self):
+        response = client.get("/docs")
+
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert "Content-Security-Policy" not in response.headers
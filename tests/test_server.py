@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from app.server import available_cpus, cgroup_cpu_limit, event_loop_options
+
+
+def write(root, name: str, content: str) -> None:
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [("max 100000\n", None), ("150000 100000\n", 1.5), ("50000 100000", 0.5)],
+)
+def test_cgroup_v2_quota(tmp_path, content, expected):
+    write(tmp_path, "cpu.max", content)
+    assert cgroup_cpu_limit(tmp_path) == expected
+
+
+def test_cgroup_v1_quota(tmp_path):
+    write(tmp_path, "cpu/cpu.cfs_quota_us", "200000\n")
+    write(tmp_path, "cpu/cpu.cfs_period_us", "100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 2.0
+
+    write(tmp_path, "cpu/cpu.cfs_quota_us", "-1\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+
+def test_no_cgroup_files(tmp_path):
+    assert cgroup_cpu_limit(tmp_path) is None
+
+
+def test_available_cpus_capped_by_quota(tmp_path):
+    write(tmp_path, "cpu.max", "150000 100000")
+    # дробная квота округляется вверх, но не выше числа доступных ядер
+    assert available_cpus(tmp_path) == min(2, len(os.sched_getaffinity(0)))
+
+    write(tmp_path, "cpu.max", "10000 100000")
+    assert available_cpus(tmp_path) == 1
+
+
+def test_event_loop_options_fall_back(monkeypatch):
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+    assert event_loop_options() == {"loop": "asyncio", "http": "h11"}
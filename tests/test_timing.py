@@ -0,0 +1,111 @@
+import logging
+
+import pytest
+
+from app.timing import (
+    QueryMonitor,
+    RequestTiming,
+    Throttle,
+    normalize_statement,
+    parameter_shape,
+    query_monitor,
+)
+
+
+def server_timing(response) -> dict[str, str]:
+    metrics = {}
+    for part in response.headers["server-timing"].split(", "):
+        name, *params = part.split(";")
+        metrics[name] = dict(p.split("=", 1) for p in params)
+    return metrics
+
+
+def test_normalize_statement_drops_values():
+    statement = (
+        "SELECT users.id FROM users\n  WHERE users.username = 'bob'"
+        " AND users.id IN (?, ?, ?) AND users_1.version > 42 LIMIT ?"
+    )
+    assert normalize_statement(statement) == (
+        "SELECT users.id FROM users WHERE users.username = ?"
+        " AND users.id IN (?, ...) AND users_1.version > ? LIMIT ?"
+    )
+
+
+def test_parameter_shape_has_types_only():
+    assert parameter_shape((1, "secret", None), False) == "int, str, NoneType"
+    assert parameter_shape({"name": "x"}, False) == "name: str"
+    assert parameter_shape([("a", 1), ("b", 2)], True) == "2 x (str, int)"
+
+
+def test_throttle_counts_suppressed_events(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.timing.time.monotonic", lambda: now[0])
+    throttle = Throttle(interval=60)
+
+    assert throttle.allow("q") == 0
+    assert throttle.allow("q") is None
+    assert throttle.allow("q") is None
+    assert throttle.allow("other") == 0
+    now[0] += 61
+    assert throttle.allow("q") == 2
+
+
+def test_slow_query_log_has_no_parameter_values(caplog):
+    monitor = QueryMonitor(slow_query_ms=10, interval=60)
+    with caplog.at_level(logging.WARNING, logger="app.timing"):
+        monitor.query("SELECT * FROM users WHERE email = ?", ("a@b.c",), False, 0.001)
+        for _ in range(3):
+            monitor.query(
+                "SELECT * FROM users WHERE email = ?", ("a@b.c",), False, 0.05
+            )
+
+    assert monitor.stats()["slow_queries"] == 3
+    [record] = caplog.records
+    assert record.statement == "SELECT * FROM users WHERE email = ?"
+    assert record.parameters == "str"
+    assert "a@b.c" not in caplog.text
+
+
+def test_request_over_query_limit_warns(caplog):
+    monitor = QueryMonitor(query_count_warn=10)
+    with caplog.at_level(logging.WARNING, logger="app.timing"):
+        monitor.request("GET", "/users", RequestTiming(0.0, queries=10))
+        monitor.request("GET", "/users", RequestTiming(0.0, queries=11))
+
+    assert monitor.stats()["query_heavy_requests"] == 1
+    [record] = caplog.records
+    assert record.route == "/users" and record.queries == 11
+    assert "possible N+1" in record.getMessage()
+
+
+def test_server_timing_header(client):
+    response = client.get("/users")
+
+    assert response.status_code == 200
+    metrics = server_timing(response)
+    assert set(metrics) == {"db", "serialize", "app"}
+    assert metrics["db"]["desc"] == '"1 queries"'
+    assert float(metrics["db"]["dur"]) > 0
+    assert float(metrics["serialize"]["dur"]) >= 0
+
+
+def test_server_timing_without_queries(client):
+    metrics = server_timing(client.get("/health"))
+
+    assert metrics["db"] == {"dur": "0.00", "desc": '"0 queries"'}
+
+
+@pytest.fixture
+def strict_query_limit(monkeypatch):
+    monkeypatch.setattr(query_monitor, "query_count_warn", 0)
+    monkeypatch.setattr(query_monitor, "throttle", Throttle())
+    monkeypatch.setattr(query_monitor, "query_heavy_requests", 0)
+
+
+def test_endpoint_over_query_limit_is_logged(client, strict_query_limit, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.timing"):
+        client.get("/users")
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert any(m.startswith("GET /users issued 1 queries") for m in messages)
+    assert "db_query_heavy_requests_total 1" in client.get("/metrics").text
@@ -1,11 +1,14 @@
+import asyncio
+import base64
+import json
 import uuid
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-from app.database import Base, get_db
+from app.database import Base, ensure_schema, get_db, to_async_url
 from app.main import app
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -13,15 +16,15 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL))
+TestingSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides[get_db] = override_get_db
@@ -33,6 +36,7 @@ client = TestClient(app)
 def test_db():
     Base.metadata.create_all(bind=engine)
     yield
+    asyncio.run(async_engine.dispose())
     Base.metadata.drop_all(bind=engine)
 
 
@@ -236,6 +240,40 @@ def test_update_user_not_found(test_db):
     assert error_data["title"] == "non existing user"
 
 
+@pytest.mark.parametrize(
+    "body", [{}, {"name": "noop_user"}, {"name": "noop_user", "email": "noop@x.com"}]
+)
+def test_noop_update_keeps_version_and_etag(test_db, body):
+    created = client.post(
+        "/users",
+        json={"name": "noop_user", "email": "noop@x.com", "password": "Password1"},
+    )
+    user_id = created.json()["id"]
+    etag = client.get(f"/users/{user_id}").headers["ETag"]
+
+    response = client.put(f"/users/{user_id}", json=body)
+    assert response.status_code == 200
+    assert response.json() == created.json()
+    cached = client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+
+def test_noop_update_of_missing_user(test_db):
+    assert client.put("/users/999", json={}).status_code == 404
+    assert client.put("/users/999", json={"name": "ghost"}).status_code == 404
+
+
+def test_password_update_always_bumps_version(test_db):
+    created = client.post(
+        "/users",
+        json={"name": "pw_user", "email": "pw@x.com", "password": "Password1"},
+    )
+    user_id = created.json()["id"]
+    # хэш солёный: тот же пароль тоже считается изменением
+    response = client.put(f"/users/{user_id}", json={"password": "Password1"})
+    assert response.json()["version"] == created.json()["version"] + 1
+
+
 def test_error_response_format(test_db):
     response = client.get("/users/999")
 
@@ -248,3 +286,360 @@ def test_error_response_format(test_db):
     assert "detail" in error_data
     assert "instance" in error_data
     assert "correlation_id" in error_data
+
+
+def test_get_users_keyset_pagination(test_db):
+    for i in range(5):
+        client.post(
+            "/users",
+            json={
+                "name": f"page_user{i}",
+                "email": f"page{i}@example.com",
+                "password": "Pass12345",
+            },
+        )
+
+    first = client.get("/users", params={"limit": 2})
+    assert first.status_code == 200
+    assert [u["username"] for u in first.json()] == ["page_user0", "page_user1"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/users", params={"limit": 2, "after": cursor})
+    assert [u["username"] for u in second.json()] == ["page_user2", "page_user3"]
+
+    last = client.get(
+        "/users", params={"limit": 2, "after": second.headers["X-Next-Cursor"]}
+    )
+    assert [u["username"] for u in last.json()] == ["page_user4"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_get_users_invalid_cursor(test_db):
+    response = client.get("/users", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["title"] == "invalid cursor"
+
+
+@pytest.mark.parametrize("raw", ["id:²", "id:" + "9" * 19, "id:" + "1" * 40])
+def test_get_users_cursor_out_of_range(test_db, raw):
+    cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    response = client.get("/users", params={"after": cursor})
+    assert response.status_code == 400
+    assert response.json()["title"] == "invalid cursor"
+
+
+def test_get_users_limit_too_large(test_db):
+    response = client.get("/users", params={"limit": 10_000})
+    assert response.status_code == 422
+
+
+def test_export_users_ndjson(test_db):
+    for i in range(3):
+        client.post(
+            "/users",
+            json={
+                "name": f"export_user{i}",
+                "email": f"export{i}@example.com",
+                "password": "Pass12345",
+            },
+        )
+
+    response = client.get("/users/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["username"] for row in rows] == [
+        "export_user0",
+        "export_user1",
+        "export_user2",
+    ]
+    assert all("password" not in row for row in rows)
+
+
+def test_create_users_bulk(test_db):
+    client.post(
+        "/users",
+        json={"name": "taken", "email": "taken@example.com", "password": "Pass12345"},
+    )
+
+    response = client.post(
+        "/users/bulk",
+        json=[
+            {"name": "bulk1", "email": "bulk1@example.com", "password": "Pass12345"},
+            {"name": "taken", "email": "other@example.com", "password": "Pass12345"},
+            {"name": "bulk2", "email": "bulk1@example.com", "password": "Pass12345"},
+            {"name": "bulk3", "email": "bulk3@example.com", "password": "weak"},
+            {"name": "bulk4", "email": "bulk4@example.com", "password": "Pass12345"},
+        ],
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 3
+    assert [r["status"] for r in data["results"]] == [201, 400, 400, 422, 201]
+    assert data["results"][0]["user"]["username"] == "bulk1"
+    assert data["results"][1]["problem"]["title"] == "existing user"
+    assert data["results"][3]["problem"]["status"] == 422
+
+    usernames = [u["username"] for u in client.get("/users").json()]
+    assert usernames == ["taken", "bulk1", "bulk4"]
+
+
+def test_create_users_bulk_too_many_items(test_db):
+    item = {"name": "bulk", "email": "bulk@example.com", "password": "Pass12345"}
+    response = client.post("/users/bulk", json=[item] * 1001)
+    assert response.status_code == 422
+
+
+def test_user_etag_conditional_get(test_db):
+    user_id = client.post(
+        "/users",
+        json={
+            "name": "etag_user",
+            "email": "etag@example.com",
+            "password": "Pass12345",
+        },
+    ).json()["id"]
+
+    first = client.get(f"/users/{user_id}")
+    etag = first.headers["ETag"]
+    assert etag.startswith('"')
+
+    cached = client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    client.put(f"/users/{user_id}", json={"name": "etag_changed"})
+    changed = client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["version"] == 2
+
+
+def test_users_collection_etag(test_db):
+    for i in range(2):
+        client.post(
+            "/users",
+            json={
+                "name": f"coll_user{i}",
+                "email": f"coll{i}@example.com",
+                "password": "Pass12345",
+            },
+        )
+
+    etag = client.get("/users").headers["ETag"]
+    assert client.get("/users", headers={"If-None-Match": etag}).status_code == 304
+
+    # изменение строки, у которой версия не максимальная, тоже меняет ETag
+    first_id = client.get("/users").json()[0]["id"]
+    client.put(f"/users/{first_id}", json={"name": "coll_renamed"})
+    response = client.get("/users", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """База со схемой до ETag: users без AUTOINCREMENT и без новых колонок"""
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    legacy_engine = create_engine(url)
+    with legacy_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR UNIQUE, "
+            "email VARCHAR UNIQUE, password VARCHAR)"
+        )
+    ensure_schema(legacy_engine)
+    legacy_async = create_async_engine(to_async_url(url))
+    sessions = async_sessionmaker(legacy_async, expire_on_commit=False)
+
+    async def legacy_get_db():
+        async with sessions() as db:
+            yield db
+
+    previous = app.dependency_overrides[get_db]
+    app.dependency_overrides[get_db] = legacy_get_db
+    yield
+    app.dependency_overrides[get_db] = previous
+    asyncio.run(legacy_async.dispose())
+    legacy_engine.dispose()
+
+
+def test_reused_id_gets_new_etag_on_legacy_table(legacy_db):
+    def create(name):
+        response = client.post(
+            "/users",
+            json={
+                "name": name,
+                "email": f"{name}@example.com",
+                "password": "Pass12345",
+            },
+        )
+        assert response.status_code == 200
+        return response.json()["id"]
+
+    create("legacy_first")
+    user_id = create("legacy_last")
+    old = client.get(f"/users/{user_id}")
+    page = client.get("/users").headers["ETag"]
+    client.delete(f"/users/{user_id}")
+
+    # без AUTOINCREMENT SQLite снова выдаёт наибольший удалённый id
+    assert create("legacy_new") == user_id
+    response = client.get(
+        f"/users/{user_id}", headers={"If-None-Match": old.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == old.json()["version"]
+    assert response.headers["ETag"] != old.headers["ETag"]
+    assert client.get("/users", headers={"If-None-Match": page}).status_code == 200
+
+
+def test_password_hash_never_returned(test_db):
+    created = client.post(
+        "/users",
+        json={
+            "name": "secretive",
+            "email": "secretive@example.com",
+            "password": "Pass12345",
+        },
+    )
+    user_id = created.json()["id"]
+
+    responses = [
+        created,
+        client.get("/users"),
+        client.get(f"/users/{user_id}"),
+        client.put(f"/users/{user_id}", json={"password": "Newpass123"}),
+        client.delete(f"/users/{user_id}"),
+    ]
+
+    for response in responses:
+        assert response.status_code == 200
+        assert "password" not in response.text
+        assert "$2b$" not in response.text
+
+
+def test_list_users_payload_matches_response_model(test_db):
+    client.post(
+        "/users",
+        json={"name": "listed", "email": "listed@example.com", "password": "Pass12345"},
+    )
+
+    [user] = client.get("/users").json()
+    assert set(user) == {"id", "username", "email", "version"}
+    schema = app.openapi()["paths"]["/users"]["get"]["responses"]["200"]
+    assert schema["content"]["application/json"]["schema"]["items"] == {
+        "$ref": "#/components/schemas/UserResponse"
+    }
+
+
+@pytest.fixture
+def statements():
+    """SQL-операторы, выполненные любым движком за время теста"""
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", record)
+
+
+def verbs(statements: list[str]) -> list[str]:
+    return [statement.split(None, 1)[0].upper() for statement in statements]
+
+
+def test_writes_are_single_returning_statements(test_db, statements):
+    created = client.post(
+        "/users",
+        json={"name": "single", "email": "single@example.com", "password": "Pass12345"},
+    )
+    assert created.status_code == 200
+    assert verbs(statements) == ["INSERT"]
+
+    statements.clear()
+    updated = client.put(f"/users/{created.json()['id']}", json={"name": "renamed"})
+    assert updated.json()["username"] == "renamed"
+    assert updated.json()["version"] == 2
+    assert verbs(statements) == ["UPDATE"]
+
+    statements.clear()
+    deleted = client.delete(f"/users/{created.json()['id']}")
+    assert deleted.json()["username"] == "renamed"
+    assert verbs(statements) == ["DELETE"]
+
+
+def test_update_conflict_and_missing_user(test_db):
+    first = client.post(
+        "/users",
+        json={"name": "first", "email": "first@example.com", "password": "Pass12345"},
+    ).json()
+    client.post(
+        "/users",
+        json={"name": "second", "email": "second@example.com", "password": "Pass12345"},
+    )
+
+    conflict = client.put(f"/users/{first['id']}", json={"email": "second@example.com"})
+    assert conflict.status_code == 400
+    assert conflict.json()["title"] == "existing user"
+    # неудачный UPDATE откатился, version не изменилась
+    assert client.get(f"/users/{first['id']}").json()["version"] == 1
+
+    # собственное имя не считается занятым
+    same = client.put(f"/users/{first['id']}", json={"name": "first"})
+    assert same.status_code == 200
+
+    missing = client.put("/users/999999", json={"name": "ghost"})
+    assert missing.status_code == 404
+
+
+def test_sparse_fieldsets(test_db, statements):
+    user_id = client.post(
+        "/users",
+        json={"name": "sparse", "email": "sparse@example.com", "password": "Pass12345"},
+    ).json()["id"]
+
+    statements.clear()
+    page = client.get("/users", params={"fields": "username"})
+    assert page.status_code == 200
+    assert page.json() == [{"id": user_id, "username": "sparse"}]
+    [select_sql] = statements
+    assert "email" not in select_sql
+    assert "password" not in select_sql
+
+    one = client.get(f"/users/{user_id}", params={"fields": "email, id"})
+    assert one.json() == {"id": user_id, "email": "sparse@example.com"}
+
+
+def test_sparse_fieldsets_etag_per_representation(test_db):
+    user_id = client.post(
+        "/users",
+        json={"name": "tagged", "email": "tagged@example.com", "password": "Pass12345"},
+    ).json()["id"]
+
+    full = client.get(f"/users/{user_id}").headers["ETag"]
+    sparse = client.get(f"/users/{user_id}", params={"fields": "username"})
+    assert sparse.headers["ETag"] != full
+
+    # полное представление уже в кэше, частичное отдаётся из него
+    cached = client.get(
+        f"/users/{user_id}",
+        params={"fields": "username"},
+        headers={"If-None-Match": sparse.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+
+    page = client.get("/users").headers["ETag"]
+    assert client.get("/users", params={"fields": "id"}).headers["ETag"] != page
+
+
+@pytest.mark.parametrize("fields", ["password", "username,password", "", "id,,email"])
+def test_sparse_fieldsets_rejects_unknown_fields(test_db, fields):
+    for url in ("/users", "/users/1"):
+        response = client.get(url, params={"fields": fields})
+        assert response.status_code == 400
+        assert response.json()["title"] == "invalid fields"